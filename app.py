@@ -7,38 +7,44 @@ except Exception as e:
 
 import streamlit as st
 from streamlit_option_menu import option_menu
-import pickle
 import pandas as pd
-import requests
 import ast
-import time
 import random
 import os
 import sys
+import artifacts
+import bundles
+from catalogs import CatalogManager
+from engine import TitleNotFoundError
+from result_cache import ResultCache
+from tmdb import fetch_poster_url, TMDBError, PLACEHOLDER_POSTER
 
-# Check if data files exist and generate them if needed
-try:
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    movies_dict_path = os.path.join(base_dir, 'movies_dict.pkl')
-    similarity_path = os.path.join(base_dir, 'similarity.pkl')
-    
-    if not os.path.exists(movies_dict_path) or not os.path.exists(similarity_path):
-        print("Data files not found. Generating them now...")
-        import generate_data
-        print("Data generation complete.")
-    else:
-        print(f"Data files found at:\n{movies_dict_path}\n{similarity_path}")
-        
-except Exception as e:
-    print(f"Error during data generation: {e}")
-    # Try running generate_data.py as a subprocess if import fails
+# Check if data files exist and generate them if needed (once per server process)
+@st.cache_resource(show_spinner=False)
+def ensure_data_files():
     try:
-        import subprocess
-        print("Attempting to generate data files via subprocess...")
-        subprocess.run([sys.executable, 'generate_data.py'], check=True)
-        print("Data files generated successfully!")
-    except Exception as sub_e:
-        print(f"Failed to generate data files: {sub_e}")
+        # Release bundles are decompressed once; later starts reuse the local copy
+        bundles.install_release_bundles()
+        
+        if not artifacts.has_published_data():
+            print("Data files not found. Generating them now...")
+            import generate_data
+            print("Data generation complete.")
+        else:
+            print(f"Data files found, current version: {artifacts.current_version() or 'legacy'}")
+            
+    except Exception as e:
+        print(f"Error during data generation: {e}")
+        # Try running generate_data.py as a subprocess if import fails
+        try:
+            import subprocess
+            print("Attempting to generate data files via subprocess...")
+            subprocess.run([sys.executable, 'generate_data.py'], check=True)
+            print("Data files generated successfully!")
+        except Exception as sub_e:
+            print(f"Failed to generate data files: {sub_e}")
+
+ensure_data_files()
 
 # Page configuration
 st.set_page_config(
@@ -230,64 +236,91 @@ with st.sidebar:
         }
     )
 if selectedmenu == "🏠 Home":
-    def fetch_posters(movie_id):
-        try:
-            response = requests.get(
-                f'https://api.themoviedb.org/3/movie/{movie_id}?api_key=cf6b9abd89d5c0bff0a66c4b2a50feea&language=en-US'
-            )
-            response.raise_for_status()
-            data = response.json()
-            poster_path = data.get('poster_path')
-            if poster_path:
-                return "https://image.tmdb.org/t/p/w500/" + poster_path
-            else:
-                return "https://via.placeholder.com/500x750?text=No+Image"
-        except Exception:
-            return "https://via.placeholder.com/500x750?text=No+Image"
+    PICKER_PAGE_SIZE = 50
+
+    @st.cache_resource
+    def load_result_cache():
+        # Shared by all sessions so popular titles are computed once
+        return ResultCache(
+            maxsize=int(os.environ.get('RESULT_CACHE_SIZE', 2048)),
+            ttl=float(os.environ.get('RESULT_CACHE_TTL_SECONDS', 3600))
+        )
 
     def recommended(movie):
-        movie_index = movies[movies['title']==movie].index[0]
-        distances = similarity[movie_index]
-        movie_list = sorted(list(enumerate(distances)), reverse=True, key=lambda x: x[1])[1:6]
+        # Pin one snapshot so a hot-swap mid-request cannot mix versions
+        snapshot = engine.snapshot
+        names, posters, posters_failed = load_result_cache().get_or_compute(
+            engine.cache_key(movie, k=5, snapshot=snapshot),
+            lambda: compute_recommendations(movie, snapshot),
+            # Placeholders from a failed TMDB call must not be served to everyone
+            cacheable=lambda result: not result[2]
+        )
+        return names, posters
+
+    def poster_for(movie_id, failures):
+        try:
+            return fetch_poster_url(movie_id)
+        except TMDBError:
+            failures.append(movie_id)
+            return PLACEHOLDER_POSTER
 
+    def compute_recommendations(movie, snapshot):
+        movie_list = engine.recommend(movie, k=5, snapshot=snapshot)
+        
         recommended_movies = []
         recommended_movies_posters = []
-        for i in movie_list:
-            movie_id = movies.iloc[i[0]].movie_id
-            
-            recommended_movies.append(movies.iloc[i[0]].title)
-            recommended_movies_posters.append(fetch_posters(movie_id))
+        poster_failures = []
+        for title, movie_id in movie_list:
+            recommended_movies.append(title)
+            recommended_movies_posters.append(poster_for(movie_id, poster_failures))
         
         # Ensure we always return exactly 5 recommendations
-        while len(recommended_movies) < 5:
+        while len(recommended_movies) < 5 and len(snapshot.movies) > 5:
             # Add random movies if we don't have enough
-            random_movie = random.choice(movies['title'].values)
+            random_movie = random.choice(snapshot.movies['title'].values)
             if random_movie not in recommended_movies and random_movie != movie:
-                movie_id = movies[movies['title']==random_movie]['movie_id'].iloc[0]
+                movie_id = snapshot.movies.iloc[snapshot.title_index[random_movie]].movie_id
                 recommended_movies.append(random_movie)
-                recommended_movies_posters.append(fetch_posters(movie_id))
+                recommended_movies_posters.append(poster_for(movie_id, poster_failures))
         
-        return recommended_movies[:5], recommended_movies_posters[:5]
+        return recommended_movies[:5], recommended_movies_posters[:5], bool(poster_failures)
 
+    @st.cache_resource
+    def load_catalogs():
+        # One manager per server process; each loaded catalog hot-swaps newly published versions
+        return CatalogManager(
+            memory_budget_bytes=int(float(os.environ.get('CATALOG_MEMORY_BUDGET_MB', 1024)) * 2**20),
+            watch_interval=float(os.environ.get('ARTIFACT_POLL_SECONDS', 30)),
+            cooccurrence_weight=float(os.environ.get('COOCCURRENCE_WEIGHT', 0.3))
+        )
+
+    def load_engine():
+        catalog_manager = load_catalogs()
+        available = catalog_manager.available()
+        catalog = st.query_params.get('catalog', os.environ.get('DEFAULT_CATALOG', artifacts.DEFAULT_CATALOG))
+        if catalog not in available:
+            catalog = artifacts.DEFAULT_CATALOG if artifacts.DEFAULT_CATALOG in available else available[0]
+        if len(available) > 1:
+            def reset_catalog_state():
+                st.session_state.pop('recommendations', None)
+                st.session_state.picker_page = 0
+            
+            catalog = st.sidebar.selectbox(
+                "🗂️ Catalog",
+                available,
+                index=available.index(catalog) if catalog in available else 0,
+                key="catalog",
+                on_change=reset_catalog_state
+            )
+        return catalog_manager.get(catalog)
+    
     # Load data
     try:
-        # Use absolute paths to ensure files can be found
-        import os
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        movies_dict_path = os.path.join(base_dir, 'movies_dict.pkl')
-        similarity_path = os.path.join(base_dir, 'similarity.pkl')
-        
-        # Print paths for debugging
-        print(f"Looking for movies_dict.pkl at: {movies_dict_path}")
-        print(f"Looking for similarity.pkl at: {similarity_path}")
+        if not artifacts.list_catalogs():
+            raise FileNotFoundError("No published data files found")
         
-        # Check if files exist
-        if not os.path.exists(movies_dict_path) or not os.path.exists(similarity_path):
-            raise FileNotFoundError("Pickle files not found at expected locations")
-            
-        movies_dict = pickle.load(open(movies_dict_path, 'rb'))
-        movies = pd.DataFrame(movies_dict)
-        similarity = pickle.load(open(similarity_path, 'rb'))
+        engine = load_engine()
+        movies = engine.movies
     except FileNotFoundError as e:
         # Generate data files if they don't exist
         st.info(f"Generating data files. This may take a few minutes... Error: {str(e)}")
@@ -296,9 +329,8 @@ if selectedmenu == "🏠 Home":
         try:
             subprocess.run([sys.executable, 'generate_data.py'], check=True)
             # Try loading again after generation
-            movies_dict = pickle.load(open(movies_dict_path, 'rb'))
-            movies = pd.DataFrame(movies_dict)
-            similarity = pickle.load(open(similarity_path, 'rb'))
+            engine = load_engine()
+            movies = engine.movies
             st.success("Data files generated successfully!")
         except Exception as e:
             st.error(f"Error generating data files: {str(e)}")
@@ -326,97 +358,149 @@ if selectedmenu == "🏠 Home":
     </div>
     """, unsafe_allow_html=True)
     
-    # Random movie suggestion
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        if st.button("🎲 Surprise Me! (Random Movie)", use_container_width=True):
-            random_movie = random.choice(movies['title'].values)
-            st.session_state.random_movie = random_movie
-            st.success(f"🎉 Try: '{random_movie}'")
-    
-    if 'random_movie' in st.session_state:
-        st.info(f"💡 Random suggestion: {st.session_state.random_movie}")
-
-    # Main recommendation interface
-    st.markdown("### 🎭 Choose Your Movie")
-    
-    # Enhanced movie selection
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        st.markdown("**🔍 Search for a movie:**")
+    # Interactive parts run as fragments: a widget inside one only reruns
+    # that fragment, not the CSS, sidebar, metrics and banner above
+    @st.fragment
+    def random_suggestion():
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            if st.button("🎲 Surprise Me! (Random Movie)", use_container_width=True):
+                random_movie = random.choice(engine.movies['title'].values)
+                st.session_state.random_movie = random_movie
+                st.success(f"🎉 Try: '{random_movie}'")
         
-        # Add search functionality with better styling
-        search_term = st.text_input(
-            "Search movies",
-            placeholder="",
-            help="Type any part of the movie title to find it quickly",
-            label_visibility="collapsed",
-            key="movie_search"
-        )
+        if 'random_movie' in st.session_state:
+            st.info(f"💡 Random suggestion: {st.session_state.random_movie}")
+
+    @st.fragment
+    def recommendation_results():
+        result = st.session_state.get('recommendations')
+        if not result or result['catalog'] != engine.name:
+            return
         
-        # Show search results count
-        if search_term:
-            filtered_count = len(movies[movies['title'].str.contains(search_term, case=False, na=False)])
-            if filtered_count > 0:
-                st.success(f"✅ Found {filtered_count} movies matching '{search_term}'")
-            else:
-                st.warning(f"❌ No movies found matching '{search_term}'. Showing popular movies instead.")
+        # Always show exactly 5 recommendations
+        st.success(f"🎉 Found 5 amazing recommendations for '{result['movie']}'!")
         
-        # Filter movies based on search term
-        if search_term:
-            filtered_movies = movies[movies['title'].str.contains(search_term, case=False, na=False)]
-            if len(filtered_movies) > 0:
-                movie_options = filtered_movies['title'].values
-            else:
-                movie_options = movies['title'].values[:10]  # Show first 10 if no match
-                st.warning("No movies found matching your search. Showing popular movies instead.")
-        else:
-            movie_options = movies['title'].values
+        # Display recommendations in a grid
+        st.markdown("### 🎬 Your Personalized Recommendations")
         
-        selected_movie_name = st.selectbox(
-            'Choose your movie:',
-            movie_options,
-            index=0,
-            help="Choose a movie from the filtered results"
-        )
-    
-    with col2:
-        st.markdown("<br>", unsafe_allow_html=True)
-        recommend_button = st.button('🚀 Get Recommendations', type="primary", use_container_width=True)
+        # Create exactly 5 columns for recommendations
+        cols = st.columns(5)
+        for idx, (movie_name, poster_url, rating) in enumerate(zip(result['names'], result['posters'], result['ratings'])):
+            with cols[idx]:
+                with st.container():
+                    st.markdown(f"""
+                    <div class="movie-card">
+                        <div class="movie-title">{movie_name}</div>
+                        <div class="movie-poster-container">
+                            <img src="{poster_url}" class="movie-poster" style="width: 100%; border-radius: 15px; box-shadow: 0 4px 15px rgba(0,0,0,0.2); transition: transform 0.3s ease;" onmouseover="this.style.transform='scale(1.05)'" onmouseout="this.style.transform='scale(1)'" />
+                        </div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # Add some interactivity
+                    if st.button(f"ℹ️ More Info", key=f"info_{idx}"):
+                        st.info(f"Learn more about '{movie_name}' - Coming soon!")
+                    
+                    # Add rating simulation
+                    st.markdown(f"⭐ {rating:.1f}/5.0")
 
-    if recommend_button:
-        with st.spinner('🔍 Analyzing your movie preferences...'):
-            time.sleep(1)  # Add loading effect
+    @st.fragment
+    def movie_picker():
+        # Main recommendation interface
+        st.markdown("### 🎭 Choose Your Movie")
+        
+        notice = st.session_state.pop('picker_notice', None)
+        if notice:
+            st.warning(notice)
+        
+        # Enhanced movie selection
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.markdown("**🔍 Search for a movie:**")
             
-            name, posters = recommended(selected_movie_name)
+            # Add search functionality with better styling
+            search_term = st.text_input(
+                "Search movies",
+                placeholder="",
+                help="Type any part of the movie title to find it quickly",
+                label_visibility="collapsed",
+                key="movie_search"
+            )
             
-            # Always show exactly 5 recommendations
-            st.success(f"🎉 Found 5 amazing recommendations for '{selected_movie_name}'!")
+            # Only one page of titles is sent to the browser per rerun
+            if st.session_state.get('picker_term') != search_term:
+                st.session_state.picker_term = search_term
+                st.session_state.picker_page = 0
+            page = st.session_state.get('picker_page', 0)
             
-            # Display recommendations in a grid
-            st.markdown("### 🎬 Your Personalized Recommendations")
+            movie_options, total_matches = engine.search_titles(
+                search_term, offset=page * PICKER_PAGE_SIZE, limit=PICKER_PAGE_SIZE
+            )
+            if not movie_options and page > 0:
+                # The catalog shrank under us (e.g. a new version was swapped in)
+                page = st.session_state.picker_page = 0
+                movie_options, total_matches = engine.search_titles(search_term, offset=0, limit=PICKER_PAGE_SIZE)
             
-            # Create exactly 5 columns for recommendations
-            cols = st.columns(5)
-            for idx, (movie_name, poster_url) in enumerate(zip(name, posters)):
-                with cols[idx]:
-                    with st.container():
-                        st.markdown(f"""
-                        <div class="movie-card">
-                            <div class="movie-title">{movie_name}</div>
-                            <div class="movie-poster-container">
-                                <img src="{poster_url}" class="movie-poster" style="width: 100%; border-radius: 15px; box-shadow: 0 4px 15px rgba(0,0,0,0.2); transition: transform 0.3s ease;" onmouseover="this.style.transform='scale(1.05)'" onmouseout="this.style.transform='scale(1)'" />
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Add some interactivity
-                        if st.button(f"ℹ️ More Info", key=f"info_{idx}"):
-                            st.info(f"Learn more about '{movie_name}' - Coming soon!")
-                        
-                        # Add rating simulation
-                        rating = random.uniform(3.5, 5.0)
-                        st.markdown(f"⭐ {rating:.1f}/5.0")
+            # Show search results count
+            if search_term:
+                if total_matches > 0:
+                    st.success(f"✅ Found {total_matches} movies matching '{search_term}'")
+                else:
+                    st.warning(f"❌ No movies found matching '{search_term}'. Showing popular movies instead.")
+                    # Show the first 10 titles, but keep total_matches at 0 so no pager is shown
+                    movie_options, _ = engine.search_titles('', offset=0, limit=10)
+            
+            selected_movie_name = st.selectbox(
+                'Choose your movie:',
+                movie_options,
+                index=0,
+                help="Choose a movie from the filtered results"
+            )
+            
+            # Page through the remaining matches
+            page_count = max(1, -(-total_matches // PICKER_PAGE_SIZE))
+            if page_count > 1:
+                def change_page(step):
+                    st.session_state.picker_page = min(max(st.session_state.picker_page + step, 0), page_count - 1)
+                
+                prev_col, info_col, next_col = st.columns([1, 2, 1])
+                with prev_col:
+                    st.button("◀ Prev", on_click=change_page, args=(-1,), disabled=page == 0, use_container_width=True)
+                with info_col:
+                    st.caption(f"Page {page + 1} of {page_count} ({total_matches:,} titles)")
+                with next_col:
+                    st.button("Next ▶", on_click=change_page, args=(1,), disabled=page >= page_count - 1, use_container_width=True)
+        
+        with col2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            recommend_button = st.button('🚀 Get Recommendations', type="primary", use_container_width=True)
+
+        if recommend_button and selected_movie_name:
+            try:
+                with st.spinner('🔍 Analyzing your movie preferences...'):
+                    name, posters = recommended(selected_movie_name)
+            except TitleNotFoundError:
+                # A newly published version dropped or renamed the title; search again
+                st.session_state.pop('recommendations', None)
+                st.session_state.picker_notice = (
+                    f"⚠️ '{selected_movie_name}' is no longer in the catalog, it was just updated. "
+                    "Please pick the movie again."
+                )
+                st.rerun()
+            # Kept in session state so later fragment reruns redraw without recomputing
+            st.session_state.recommendations = {
+                'catalog': engine.name,
+                'movie': selected_movie_name,
+                'names': name,
+                'posters': posters,
+                'ratings': [random.uniform(3.5, 5.0) for _ in name],
+            }
+        
+        recommendation_results()
+
+    random_suggestion()
+    movie_picker()
 
 elif selectedmenu == "📁 Projects":
     st.markdown('<h1 class="main-header">📁 My Projects</h1>', unsafe_allow_html=True)
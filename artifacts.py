@@ -0,0 +1,353 @@
+"""
+Versioned Artifact Store for Movie Recommendation App
+Builds are written to their own version directory together with a manifest,
+then published by atomically switching the CURRENT pointer file. Readers
+only ever see complete builds, and older versions are kept for rollback.
+"""
+
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+
+import numpy as np
+
+from neighbors import NeighborIndex
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACTS_DIR = os.path.join(BASE_DIR, 'artifacts')
+VERSIONS_DIRNAME = 'versions'
+CATALOGS_DIRNAME = 'catalogs'
+DEFAULT_CATALOG = 'default'
+CURRENT_POINTER = 'CURRENT'
+MANIFEST_NAME = 'manifest.json'
+MOVIES_FILE = 'movies_dict.pkl'
+SIMILARITY_FILE = 'similarity.pkl'
+NEIGHBOR_IDS_FILE = 'neighbor_ids.npy'
+NEIGHBOR_SCORES_FILE = 'neighbor_scores.npy'
+
+# Legacy in-place artifacts written next to app.py by older builds
+LEGACY_MOVIES_PATH = os.path.join(BASE_DIR, MOVIES_FILE)
+LEGACY_SIMILARITY_PATH = os.path.join(BASE_DIR, SIMILARITY_FILE)
+
+
+class ArtifactError(Exception):
+    """Raised when a published version is missing or fails verification"""
+
+
+def catalog_dir(name=DEFAULT_CATALOG, artifacts_dir=ARTIFACTS_DIR):
+    """Artifact store for a named catalog; the default catalog lives at the root"""
+    if name == DEFAULT_CATALOG:
+        return artifacts_dir
+    if not name or os.sep in name or name.startswith('.'):
+        raise ArtifactError(f"Invalid catalog name: {name!r}")
+    return os.path.join(artifacts_dir, CATALOGS_DIRNAME, name)
+
+
+def list_catalogs(artifacts_dir=ARTIFACTS_DIR):
+    """Names of all catalogs that have something to load"""
+    catalogs = []
+    if has_published_data(artifacts_dir):
+        catalogs.append(DEFAULT_CATALOG)
+    catalogs_root = os.path.join(artifacts_dir, CATALOGS_DIRNAME)
+    if os.path.isdir(catalogs_root):
+        catalogs.extend(sorted(
+            name for name in os.listdir(catalogs_root)
+            if current_version(os.path.join(catalogs_root, name))
+        ))
+    return catalogs
+
+
+def _legacy_available(artifacts_dir):
+    # Legacy pickles only ever belonged to the default store
+    return (
+        os.path.abspath(artifacts_dir) == ARTIFACTS_DIR
+        and os.path.exists(LEGACY_MOVIES_PATH)
+        and os.path.exists(LEGACY_SIMILARITY_PATH)
+    )
+
+
+def _versions_dir(artifacts_dir):
+    return os.path.join(artifacts_dir, VERSIONS_DIRNAME)
+
+
+def version_path(version, artifacts_dir=ARTIFACTS_DIR):
+    """Return the directory holding a published version"""
+    return os.path.join(_versions_dir(artifacts_dir), version)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path):
+    """Flush a directory entry to disk (no-op where unsupported)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_pickle(obj, path):
+    with open(path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _atomic_write_text(path, text):
+    """Write text to path so that readers see either the old or new content"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+def new_version_id():
+    """Return a sortable, unique version identifier"""
+    now = time.time()
+    return time.strftime('%Y%m%d-%H%M%S', time.gmtime(now)) + f"-{int(now * 1000000) % 1000000:06d}-{os.getpid()}"
+
+
+def current_version(artifacts_dir=ARTIFACTS_DIR):
+    """Return the currently published version, or None if nothing is published"""
+    pointer = os.path.join(artifacts_dir, CURRENT_POINTER)
+    try:
+        with open(pointer) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def list_versions(artifacts_dir=ARTIFACTS_DIR):
+    """Return all complete versions on disk, oldest first"""
+    versions_dir = _versions_dir(artifacts_dir)
+    if not os.path.isdir(versions_dir):
+        return []
+    # Staging directories are dot-prefixed and get their manifest before the rename
+    return sorted(
+        name for name in os.listdir(versions_dir)
+        if not name.startswith('.')
+        and os.path.exists(os.path.join(versions_dir, name, MANIFEST_NAME))
+    )
+
+
+def read_manifest(version, artifacts_dir=ARTIFACTS_DIR):
+    """Load the manifest of a published version"""
+    path = os.path.join(version_path(version, artifacts_dir), MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ArtifactError(f"Version {version} has no manifest at {path}")
+
+
+def has_published_data(artifacts_dir=ARTIFACTS_DIR):
+    """Check whether there is anything the app can load"""
+    if current_version(artifacts_dir):
+        return True
+    return _legacy_available(artifacts_dir)
+
+
+def set_current(version, artifacts_dir=ARTIFACTS_DIR):
+    """Atomically point CURRENT at an existing version"""
+    read_manifest(version, artifacts_dir)
+    _atomic_write_text(os.path.join(artifacts_dir, CURRENT_POINTER), version + "\n")
+
+
+def _write_array(array, path):
+    with open(path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_data_files(directory, movies_dict, similarity):
+    """
+    Write a build's data files into directory. A NeighborIndex is stored as
+    two .npy arrays so it can be memory-mapped; a dense matrix is pickled.
+    """
+    _write_pickle(movies_dict, os.path.join(directory, MOVIES_FILE))
+    if isinstance(similarity, NeighborIndex):
+        _write_array(similarity.ids, os.path.join(directory, NEIGHBOR_IDS_FILE))
+        _write_array(similarity.scores, os.path.join(directory, NEIGHBOR_SCORES_FILE))
+    else:
+        _write_pickle(similarity, os.path.join(directory, SIMILARITY_FILE))
+
+
+def staging_dir_for(version, artifacts_dir=ARTIFACTS_DIR):
+    """Create an empty staging directory for a version that is being written"""
+    versions_dir = _versions_dir(artifacts_dir)
+    os.makedirs(versions_dir, exist_ok=True)
+    staging_dir = os.path.join(versions_dir, f".{version}.staging.{os.getpid()}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    return staging_dir
+
+
+def commit_version(staging_dir, version, artifacts_dir=ARTIFACTS_DIR, metadata=None, created_at=None):
+    """
+    Write the manifest for the files in staging_dir and move it into place
+    as a complete version. Does not move the CURRENT pointer.
+    """
+    try:
+        names = sorted(name for name in os.listdir(staging_dir) if name != MANIFEST_NAME)
+        manifest = {
+            'version': version,
+            'created_at': created_at or time.time(),
+            'previous': current_version(artifacts_dir),
+            'files': {
+                name: {
+                    'sha256': _sha256(os.path.join(staging_dir, name)),
+                    'size': os.path.getsize(os.path.join(staging_dir, name)),
+                }
+                for name in names
+            },
+            'metadata': metadata or {},
+        }
+        _atomic_write_text(os.path.join(staging_dir, MANIFEST_NAME), json.dumps(manifest, indent=2))
+
+        os.replace(staging_dir, version_path(version, artifacts_dir))
+        _fsync_dir(_versions_dir(artifacts_dir))
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    return manifest
+
+
+def publish_version(movies_dict, similarity, artifacts_dir=ARTIFACTS_DIR, keep=3, metadata=None):
+    """
+    Write a complete build to a fresh version directory and publish it.
+    The pointer only moves once every file and the manifest are on disk.
+    Returns the new version id.
+    """
+    version = new_version_id()
+    staging_dir = staging_dir_for(version, artifacts_dir)
+    try:
+        write_data_files(staging_dir, movies_dict, similarity)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    commit_version(staging_dir, version, artifacts_dir, metadata)
+
+    set_current(version, artifacts_dir)
+    print(f"Published artifact version {version}")
+
+    prune_versions(artifacts_dir, keep=keep)
+    return version
+
+
+def prune_versions(artifacts_dir=ARTIFACTS_DIR, keep=3):
+    """Delete old versions, always keeping the current one and its predecessor"""
+    versions = list_versions(artifacts_dir)
+    current = current_version(artifacts_dir)
+    protected = {current}
+    if current:
+        try:
+            protected.add(read_manifest(current, artifacts_dir).get('previous'))
+        except ArtifactError:
+            pass
+
+    removable = [v for v in versions if v not in protected]
+    excess = len(versions) - max(keep, len(protected))
+    for version in removable[:max(excess, 0)]:
+        shutil.rmtree(version_path(version, artifacts_dir), ignore_errors=True)
+        print(f"Pruned artifact version {version}")
+
+
+def rollback(artifacts_dir=ARTIFACTS_DIR):
+    """Point CURRENT back at the version that preceded it; returns that version"""
+    current = current_version(artifacts_dir)
+    if current is None:
+        raise ArtifactError("Nothing is published, cannot roll back")
+    previous = read_manifest(current, artifacts_dir).get('previous')
+    if not previous or previous not in list_versions(artifacts_dir):
+        raise ArtifactError(f"Version {current} has no previous version on disk")
+    set_current(previous, artifacts_dir)
+    print(f"Rolled back artifact version {current} -> {previous}")
+    return previous
+
+
+def content_digest(version, artifacts_dir=ARTIFACTS_DIR):
+    """Digest of a version's data files; identical builds share a digest"""
+    files = read_manifest(version, artifacts_dir)['files']
+    return hashlib.sha256(
+        "".join(files[name]['sha256'] for name in sorted(files)).encode()
+    ).hexdigest()
+
+
+def verify_version(version, artifacts_dir=ARTIFACTS_DIR):
+    """Check every file of a version against the manifest checksums"""
+    manifest = read_manifest(version, artifacts_dir)
+    directory = version_path(version, artifacts_dir)
+    for name, info in manifest['files'].items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path) or _sha256(path) != info['sha256']:
+            raise ArtifactError(f"Version {version} failed verification for {name}")
+
+
+def load_version(version, artifacts_dir=ARTIFACTS_DIR, verify=True):
+    """
+    Load (movies_dict, similarity) for a version. Checksums are computed when
+    a version is committed or installed from a bundle, so loading only checks
+    that every file is present with the size in the manifest; reading whole
+    files here would defeat memory-mapping. Use verify_version for a full check.
+    """
+    manifest = read_manifest(version, artifacts_dir)
+    directory = version_path(version, artifacts_dir)
+
+    if verify:
+        for name, info in manifest['files'].items():
+            path = os.path.join(directory, name)
+            if not os.path.exists(path) or os.path.getsize(path) != info['size']:
+                raise ArtifactError(f"Version {version} failed verification for {name}")
+
+    with open(os.path.join(directory, MOVIES_FILE), 'rb') as f:
+        movies_dict = pickle.load(f)
+    if NEIGHBOR_IDS_FILE in manifest['files']:
+        # Memory-mapped: pages are shared between processes and loaded lazily
+        similarity = NeighborIndex(
+            np.load(os.path.join(directory, NEIGHBOR_IDS_FILE), mmap_mode='r'),
+            np.load(os.path.join(directory, NEIGHBOR_SCORES_FILE), mmap_mode='r'),
+        )
+    else:
+        with open(os.path.join(directory, SIMILARITY_FILE), 'rb') as f:
+            similarity = pickle.load(f)
+    return movies_dict, similarity
+
+
+def load_current(artifacts_dir=ARTIFACTS_DIR, verify=True):
+    """
+    Load the currently published build.
+    Returns (version, movies_dict, similarity). Falls back to the legacy
+    in-place pickles (version 'legacy') when nothing has been published yet.
+    """
+    version = current_version(artifacts_dir)
+    if version is not None:
+        movies_dict, similarity = load_version(version, artifacts_dir, verify=verify)
+        return version, movies_dict, similarity
+
+    if _legacy_available(artifacts_dir):
+        with open(LEGACY_MOVIES_PATH, 'rb') as f:
+            movies_dict = pickle.load(f)
+        with open(LEGACY_SIMILARITY_PATH, 'rb') as f:
+            similarity = pickle.load(f)
+        return 'legacy', movies_dict, similarity
+
+    raise FileNotFoundError(f"No published artifacts found in {artifacts_dir}")
@@ -0,0 +1,109 @@
+"""
+Content-Addressed Stage Cache for the Data Build
+Each build stage stores its output on disk under a key derived from the
+stage name, its code version, its parameters and the keys of its inputs.
+Rerunning the build with unchanged inputs and parameters reuses the
+cached output instead of recomputing it.
+"""
+
+import os
+import json
+import time
+import pickle
+import hashlib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, '.build_cache')
+
+
+def file_digest(path):
+    """Content hash of an input file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(stage, version, params, inputs):
+    """Hash a stage's identity; inputs are upstream keys or file digests"""
+    payload = json.dumps({
+        'stage': stage,
+        'version': version,
+        'params': params,
+        'inputs': inputs,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageCache:
+    """Pickle-backed cache of stage outputs, one file per (stage, key)"""
+
+    def __init__(self, cache_dir=CACHE_DIR, enabled=True, keep_per_stage=5):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.keep_per_stage = keep_per_stage
+        self.hits = []
+        self.misses = []
+
+    def _path(self, stage, key):
+        return os.path.join(self.cache_dir, stage, f"{key}.pkl")
+
+    def run(self, stage, version, params, inputs, compute):
+        """
+        Return (key, output) for a stage, computing and storing it on a miss.
+        `compute` is called with no arguments and must be deterministic for
+        the given params and inputs.
+        """
+        key = stage_key(stage, version, params, inputs)
+        path = self._path(stage, key)
+
+        if self.enabled and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    output = pickle.load(f)
+                os.utime(path)
+                self.hits.append(stage)
+                print(f"[cache hit]  {stage} ({key[:12]})")
+                return key, output
+            except Exception as e:
+                print(f"[cache] Ignoring unreadable entry for {stage}: {e}")
+
+        start = time.perf_counter()
+        output = compute()
+        elapsed = time.perf_counter() - start
+        self.misses.append(stage)
+        print(f"[cache miss] {stage} ({key[:12]}) computed in {elapsed:.1f}s")
+
+        if self.enabled:
+            self._store(stage, path, output)
+        return key, output
+
+    def _store(self, stage, path, output):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[cache] Could not store {stage}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune(stage)
+
+    def _prune(self, stage):
+        """Keep only the most recently used entries of a stage"""
+        stage_dir = os.path.join(self.cache_dir, stage)
+        entries = [
+            os.path.join(stage_dir, name) for name in os.listdir(stage_dir)
+            if name.endswith('.pkl')
+        ]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for path in entries[self.keep_per_stage:]:
+            os.remove(path)
+
+    def clear(self):
+        import shutil
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
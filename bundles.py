@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Compressed Artifact Bundles for Movie Recommendation App
+A bundle packs one published version into a single compact file that can
+ship with a release: independently compressed blocks of each data file,
+followed by a JSON index and its length as a trailer. On first start the bundle is decompressed once
+into the local artifact store; later starts find the version already
+installed and memory-map it instead of rebuilding from the CSVs.
+
+    python bundles.py export --out bundles/default.m2wb
+    python bundles.py install bundles/default.m2wb
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import shutil
+import hashlib
+import argparse
+
+import artifacts
+
+MAGIC = b'M2WBNDL2'
+BUNDLE_EXTENSION = '.m2wb'
+BUNDLES_DIR = os.path.join(artifacts.BASE_DIR, 'bundles')
+BLOCK_SIZE = 4 * 2**20
+
+
+def _zstd_codec():
+    import zstandard
+    return (lambda data: zstandard.ZstdCompressor(level=10).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+
+def _lz4_codec():
+    import lz4.frame
+    return (lambda data: lz4.frame.compress(data, compression_level=9),
+            lz4.frame.decompress)
+
+
+def _zlib_codec():
+    import zlib
+    return (lambda data: zlib.compress(data, 9), zlib.decompress)
+
+
+CODECS = {'zstd': _zstd_codec, 'lz4': _lz4_codec, 'zlib': _zlib_codec}
+# zlib is in the stdlib, so every deployment can install the bundle; zstd and
+# lz4 are opt-in with --codec and must then be installed wherever it is used
+DEFAULT_CODEC = 'zlib'
+
+
+def get_codec(name):
+    """(compress, decompress) functions for a codec name"""
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise artifacts.ArtifactError(f"Unknown bundle codec: {name}")
+    except ImportError:
+        raise artifacts.ArtifactError(f"Bundle codec '{name}' is not installed (pip install {'zstandard' if name == 'zstd' else name})")
+
+
+def export_bundle(out_path, catalog=artifacts.DEFAULT_CATALOG, version=None, codec=None,
+                  block_size=BLOCK_SIZE, artifacts_dir=artifacts.ARTIFACTS_DIR):
+    """Pack a published version (default: the current one) into a bundle file"""
+    store = artifacts.catalog_dir(catalog, artifacts_dir)
+    version = version or artifacts.current_version(store)
+    if version is None:
+        raise artifacts.ArtifactError(f"Catalog '{catalog}' has no published version to export")
+    manifest = artifacts.read_manifest(version, store)
+    directory = artifacts.version_path(version, store)
+    codec = codec or DEFAULT_CODEC
+    compress, _ = get_codec(codec)
+
+    index = {
+        'catalog': catalog,
+        'version': version,
+        'codec': codec,
+        'created_at': manifest['created_at'],
+        'metadata': manifest.get('metadata', {}),
+        'files': {},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as out:
+            # Blocks are streamed out as they are compressed; the index goes last
+            out.write(MAGIC)
+            offset = 0
+            for name, info in sorted(manifest['files'].items()):
+                entry = {'sha256': info['sha256'], 'size': info['size'], 'blocks': []}
+                with open(os.path.join(directory, name), 'rb') as f:
+                    for raw in iter(lambda: f.read(block_size), b''):
+                        data = compress(raw)
+                        entry['blocks'].append([offset, len(data), len(raw)])
+                        out.write(data)
+                        offset += len(data)
+                index['files'][name] = entry
+            header = json.dumps(index).encode()
+            out.write(header)
+            out.write(struct.pack('<Q', len(header)))
+        os.replace(tmp_path, out_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    raw_size = sum(info['size'] for info in manifest['files'].values())
+    print(f"Exported {catalog}/{version} to {out_path}: "
+          f"{raw_size / 2**20:.1f} MB -> {os.path.getsize(out_path) / 2**20:.1f} MB ({codec})")
+    return out_path
+
+
+def read_index(bundle_path):
+    """Return (index, data_offset) for a bundle"""
+    with open(bundle_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise artifacts.ArtifactError(f"{bundle_path} is not a bundle")
+        f.seek(-8, os.SEEK_END)
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        f.seek(-8 - header_len, os.SEEK_END)
+        index = json.loads(f.read(header_len))
+    return index, len(MAGIC)
+
+
+def install_bundle(bundle_path, artifacts_dir=artifacts.ARTIFACTS_DIR, publish=True):
+    """
+    Decompress a bundle into the local artifact store, unless that version is
+    already installed. With publish, CURRENT is moved to a version this call
+    installed when nothing is published or it is newer than every installed
+    version; a version that is already on disk is never republished, so an
+    explicit rollback survives restarts. Returns (catalog, version, installed_now).
+    """
+    index, data_offset = read_index(bundle_path)
+    catalog, version = index['catalog'], index['version']
+    store = artifacts.catalog_dir(catalog, artifacts_dir)
+
+    existing = artifacts.list_versions(store)
+    installed_now = version not in existing
+    if installed_now:
+        start = time.perf_counter()
+        _, decompress = get_codec(index['codec'])
+        staging_dir = artifacts.staging_dir_for(version, store)
+        try:
+            with open(bundle_path, 'rb') as src:
+                for name, entry in index['files'].items():
+                    digest = hashlib.sha256()
+                    with open(os.path.join(staging_dir, name), 'wb') as dst:
+                        for offset, length, raw_length in entry['blocks']:
+                            src.seek(data_offset + offset)
+                            raw = decompress(src.read(length))
+                            if len(raw) != raw_length:
+                                raise artifacts.ArtifactError(f"Corrupt block in {name} of {bundle_path}")
+                            digest.update(raw)
+                            dst.write(raw)
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    if digest.hexdigest() != entry['sha256']:
+                        raise artifacts.ArtifactError(f"Checksum mismatch for {name} in {bundle_path}")
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        metadata = dict(index.get('metadata', {}), installed_from=os.path.basename(bundle_path))
+        try:
+            artifacts.commit_version(staging_dir, version, store, metadata, created_at=index['created_at'])
+        except OSError:
+            # Another process installed the same version first
+            if version not in artifacts.list_versions(store):
+                raise
+            installed_now = False
+        if installed_now:
+            print(f"Installed {catalog}/{version} from {bundle_path} in {time.perf_counter() - start:.1f}s")
+
+    if publish and installed_now:
+        if artifacts.current_version(store) is None or all(v < version for v in existing):
+            artifacts.set_current(version, store)
+    return catalog, version, installed_now
+
+
+def install_release_bundles(bundles_dir=BUNDLES_DIR, artifacts_dir=artifacts.ARTIFACTS_DIR):
+    """Install every bundle shipped in bundles_dir; returns the number installed now"""
+    if not os.path.isdir(bundles_dir):
+        return 0
+    installed = 0
+    for name in sorted(os.listdir(bundles_dir)):
+        if name.endswith(BUNDLE_EXTENSION):
+            try:
+                installed += install_bundle(os.path.join(bundles_dir, name), artifacts_dir)[2]
+            except Exception as e:
+                print(f"Could not install bundle {name}: {e}")
+    return installed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or install compressed artifact bundles")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="Pack a published version into a bundle")
+    export.add_argument('--catalog', default=artifacts.DEFAULT_CATALOG)
+    export.add_argument('--version', default=None, help="Version to export (default: current)")
+    export.add_argument('--codec', choices=sorted(CODECS), default=DEFAULT_CODEC,
+                        help="zstd and lz4 need zstandard / lz4 installed on every machine that installs the bundle")
+    export.add_argument('--out', default=None, help=f"Output file (default: bundles/<catalog>{BUNDLE_EXTENSION})")
+    install = sub.add_parser('install', help="Decompress a bundle into the local artifact store")
+    install.add_argument('bundle')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        out = args.out or os.path.join(BUNDLES_DIR, f"{args.catalog}{BUNDLE_EXTENSION}")
+        export_bundle(out, catalog=args.catalog, version=args.version, codec=args.codec)
+    else:
+        catalog, version, installed_now = install_bundle(args.bundle)
+        if not installed_now:
+            print(f"{catalog}/{version} is already installed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
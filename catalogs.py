@@ -0,0 +1,160 @@
+"""
+Catalog Manager for Movie Recommendation App
+Serves several named catalogs (e.g. regional or kids catalogs) from one
+process. Catalogs are loaded on first use and the least recently used ones
+are evicted when their combined size exceeds the memory budget. The
+budget is checked again whenever a loaded catalog swaps versions or
+reloads its co-occurrence model.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+import artifacts
+from engine import RecommendationEngine
+
+
+class CatalogStats:
+    """Load and eviction counters for one catalog"""
+
+    def __init__(self):
+        self.requests = 0
+        self.loads = 0
+        self.evictions = 0
+        self.last_load_seconds = 0.0
+        self.total_load_seconds = 0.0
+        self.nbytes = 0
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'last_load_seconds': round(self.last_load_seconds, 3),
+            'total_load_seconds': round(self.total_load_seconds, 3),
+            'nbytes': self.nbytes,
+        }
+
+
+class CatalogManager:
+    """Loads engines per catalog on demand and keeps them within a memory budget"""
+
+    def __init__(self, memory_budget_bytes, artifacts_dir=artifacts.ARTIFACTS_DIR, watch_interval=None,
+                 cooccurrence_weight=0.3):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.cooccurrence_weight = cooccurrence_weight
+        self.artifacts_dir = artifacts_dir
+        self.watch_interval = watch_interval
+        self._engines = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def available(self):
+        return artifacts.list_catalogs(self.artifacts_dir)
+
+    def get(self, name=artifacts.DEFAULT_CATALOG):
+        """Return the engine for a catalog, loading it (and evicting others) if needed"""
+        with self._lock:
+            stats = self._stats.setdefault(name, CatalogStats())
+            stats.requests += 1
+            engine = self._engines.get(name)
+            if engine is not None:
+                self._engines.move_to_end(name)
+                return engine
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load outside the manager lock so other catalogs keep being served
+        with load_lock:
+            with self._lock:
+                engine = self._engines.get(name)
+                if engine is not None:
+                    self._engines.move_to_end(name)
+                    return engine
+
+            start = time.perf_counter()
+            engine = RecommendationEngine(
+                artifacts.catalog_dir(name, self.artifacts_dir),
+                name=name,
+                cooccurrence_weight=self.cooccurrence_weight,
+                on_change=self._engine_changed
+            )
+            elapsed = time.perf_counter() - start
+            if self.watch_interval:
+                engine.start_watcher(self.watch_interval)
+
+            with self._lock:
+                stats.loads += 1
+                stats.last_load_seconds = elapsed
+                stats.total_load_seconds += elapsed
+                self._engines[name] = engine
+                self._evict_over_budget(keep=name)
+            print(f"Loaded catalog '{name}' in {elapsed:.2f}s "
+                  f"({self.memory_bytes() / 2**20:.1f} MB of {self.memory_budget_bytes / 2**20:.0f} MB budget used)")
+            return engine
+
+    @staticmethod
+    def _engines_nbytes(engines):
+        """Memory held by engines, counting data shared between catalogs once"""
+        seen = {}
+        for engine in engines:
+            for snap in engine.snapshots():
+                seen.setdefault(id(snap.similarity), snap.nbytes)
+            model = engine.cooccurrence
+            if model is not None:
+                seen.setdefault(id(model), model.nbytes)
+        return sum(seen.values())
+
+    def memory_bytes(self):
+        with self._lock:
+            engines = list(self._engines.values())
+        return self._engines_nbytes(engines)
+
+    def _engine_changed(self, engine):
+        """A loaded engine swapped versions or reloaded its model; re-check the budget"""
+        with self._lock:
+            if self._engines.get(engine.name) is engine:
+                self._evict_over_budget()
+
+    def _evict_over_budget(self, keep=None):
+        """Drop least recently used catalogs until the rest fit; caller holds the lock"""
+        for name, engine in self._engines.items():
+            self._stats[name].nbytes = self._engines_nbytes([engine])
+
+        while len(self._engines) > 1:
+            used = self._engines_nbytes(self._engines.values())
+            if used <= self.memory_budget_bytes:
+                break
+            victim = next(name for name in self._engines if name != keep)
+            self.evict(victim, _locked=True)
+
+    def evict(self, name, _locked=False):
+        """Unload a catalog; it is reloaded on its next request"""
+        if not _locked:
+            with self._lock:
+                return self.evict(name, _locked=True)
+        engine = self._engines.pop(name, None)
+        if engine is None:
+            return False
+        # Don't block the manager on a refresh that is still loading
+        engine.stop_watcher(wait=False)
+        self._stats[name].evictions += 1
+        self._stats[name].nbytes = 0
+        print(f"Evicted catalog '{name}'")
+        return True
+
+    def metrics(self):
+        """Per-catalog counters plus overall memory use"""
+        with self._lock:
+            catalogs = {name: stats.as_dict() for name, stats in self._stats.items()}
+            loaded = list(self._engines)
+            engines = list(self._engines.values())
+        for name in catalogs:
+            catalogs[name]['loaded'] = name in loaded
+        return {
+            'catalogs': catalogs,
+            'loaded': loaded,
+            'memory_bytes': self._engines_nbytes(engines),
+            'memory_budget_bytes': self.memory_budget_bytes,
+        }
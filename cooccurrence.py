@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Co-occurrence Engine for Movie Recommendation App
+Builds item-item neighbors from watch/rating events ("people who watched
+X also watched Y"). Events are streamed in chunks into a sparse binary
+user x movie matrix, co-occurrence counts are computed block by block as
+sparse products, normalized by cosine (count / sqrt(n_i * n_j)) and only
+the top-K neighbors per movie are kept. No dense movie x movie matrix is
+ever built, so tens of millions of events fit on one machine.
+
+    python cooccurrence.py build events.csv --catalog default --min-rating 3.5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import artifacts
+from neighbors import NeighborIndex
+
+COOCCURRENCE_DIRNAME = 'cooccurrence'
+MODEL_FILE = 'model.npz'
+
+
+def store_model_path(store_dir):
+    """Where the co-occurrence model lives inside a catalog's artifact store"""
+    return os.path.join(store_dir, COOCCURRENCE_DIRNAME, MODEL_FILE)
+
+
+def model_path(catalog=artifacts.DEFAULT_CATALOG, artifacts_dir=artifacts.ARTIFACTS_DIR):
+    """Where the co-occurrence model for a catalog is stored"""
+    return store_model_path(artifacts.catalog_dir(catalog, artifacts_dir))
+
+
+class CooccurrenceModel:
+    """Top-K co-occurring movies per movie, keyed by TMDB movie_id"""
+
+    def __init__(self, movie_ids, index, metadata=None):
+        self.movie_ids = movie_ids
+        self.index = index
+        self.metadata = metadata or {}
+        self._position = {int(movie_id): pos for pos, movie_id in enumerate(movie_ids.tolist())}
+
+    def neighbors(self, movie_id):
+        """(movie_id, score) pairs for a movie, best first; empty if it has no events"""
+        pos = self._position.get(int(movie_id))
+        if pos is None:
+            return []
+        return [
+            (int(self.movie_ids[idx]), score)
+            for idx, score in self.index.neighbors(pos)
+            if score > 0
+        ]
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the model"""
+        return (self.movie_ids.nbytes + self.index.ids.nbytes + self.index.scores.nbytes
+                + sys.getsizeof(self._position) + 2 * 32 * len(self._position))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}.npz"
+        np.savez(
+            tmp_path,
+            movie_ids=self.movie_ids,
+            ids=self.index.ids,
+            scores=self.index.scores,
+            metadata=np.array(json.dumps(self.metadata)),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            metadata = json.loads(str(data['metadata']))
+            return cls(data['movie_ids'], NeighborIndex(data['ids'], data['scores']), metadata)
+
+
+def iter_event_chunks(path, chunksize, columns):
+    """Yield DataFrames of events from a CSV or Parquet log without loading it whole"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+class InteractionAccumulator:
+    """Streams (user, movie) events into a sparse binary user x movie matrix"""
+
+    def __init__(self, compact_every=5_000_000):
+        self.compact_every = compact_every
+        self._users = {}
+        self._movies = {}
+        self._rows = []
+        self._cols = []
+        self._pending = 0
+        self._matrix = None
+        self.events = 0
+
+    @staticmethod
+    def _codes(values, mapping):
+        """Dense integer codes for ids, stable across chunks"""
+        inverse, uniques = pd.factorize(values)
+        unique_codes = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques.tolist()):
+            code = mapping.get(value)
+            if code is None:
+                code = mapping[value] = len(mapping)
+            unique_codes[i] = code
+        return unique_codes[inverse]
+
+    def add(self, users, movies):
+        self._rows.append(self._codes(users, self._users))
+        self._cols.append(self._codes(movies, self._movies))
+        self._pending += len(users)
+        self.events += len(users)
+        if self._pending >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        """Fold pending events into the matrix, collapsing repeat views to one"""
+        if not self._rows:
+            return
+        rows = np.concatenate(self._rows)
+        cols = np.concatenate(self._cols)
+        self._rows, self._cols, self._pending = [], [], 0
+        shape = (len(self._users), len(self._movies))
+        chunk = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+        if self._matrix is not None:
+            old = self._matrix
+            old.resize(shape)
+            chunk = chunk + old
+        chunk.data[:] = 1.0
+        self._matrix = chunk
+
+    def matrix(self):
+        """(user x movie CSR matrix, movie_ids array in column order)"""
+        self._compact()
+        movie_ids = np.empty(len(self._movies), dtype=np.int64)
+        for movie_id, code in self._movies.items():
+            movie_ids[code] = movie_id
+        matrix = self._matrix if self._matrix is not None else sp.csr_matrix((0, 0), dtype=np.float32)
+        return matrix, movie_ids
+
+
+def cap_user_history(matrix, max_items, seed=0):
+    """Subsample very heavy users so no single user dominates the counts"""
+    lengths = np.diff(matrix.indptr)
+    heavy = np.flatnonzero(lengths > max_items)
+    if len(heavy) == 0:
+        return matrix
+    rng = np.random.default_rng(seed)
+    keep = np.ones(matrix.nnz, dtype=bool)
+    for user in heavy:
+        start, stop = matrix.indptr[user], matrix.indptr[user + 1]
+        drop = rng.choice(stop - start, size=stop - start - max_items, replace=False)
+        keep[start + drop] = False
+    coo = matrix.tocoo()
+    return sp.csr_matrix(
+        (coo.data[keep], (coo.row[keep], coo.col[keep])), shape=matrix.shape
+    )
+
+
+def topk_cooccurrence(matrix, top_k=50, min_count=2, block_size=2048):
+    """
+    Cosine-normalized top-K co-occurrence neighbors for every movie column.
+    Counts are computed for block_size movies at a time as a sparse product.
+    """
+    n_movies = matrix.shape[1]
+    by_movie = matrix.T.tocsr()
+    support = np.asarray(by_movie.sum(axis=1)).ravel()
+    support[support == 0] = 1.0
+    inv_sqrt = 1.0 / np.sqrt(support)
+    top_k = max(1, min(top_k, n_movies - 1))
+
+    ids = np.zeros((n_movies, top_k), dtype=np.int32)
+    scores = np.zeros((n_movies, top_k), dtype=np.float32)
+    for start in range(0, n_movies, block_size):
+        stop = min(start + block_size, n_movies)
+        counts = (by_movie[start:stop] @ matrix).tocsr()
+        for row in range(stop - start):
+            lo, hi = counts.indptr[row], counts.indptr[row + 1]
+            cols = counts.indices[lo:hi]
+            values = counts.data[lo:hi]
+            mask = (cols != start + row) & (values >= min_count)
+            cols, values = cols[mask], values[mask]
+            if len(cols) == 0:
+                ids[start + row] = start + row
+                continue
+            normalized = values * inv_sqrt[start + row] * inv_sqrt[cols]
+            if len(cols) > top_k:
+                best = np.argpartition(-normalized, top_k - 1)[:top_k]
+                cols, normalized = cols[best], normalized[best]
+            order = np.argsort(-normalized, kind='stable')
+            ids[start + row, :len(order)] = cols[order]
+            ids[start + row, len(order):] = start + row
+            scores[start + row, :len(order)] = normalized[order]
+    return NeighborIndex(ids, scores)
+
+
+def build_model(events_path, user_col='user_id', movie_col='movie_id', rating_col=None,
+                min_rating=None, chunksize=1_000_000, top_k=50, min_count=2,
+                max_items_per_user=500):
+    """Stream an event log and return a CooccurrenceModel"""
+    columns = [user_col, movie_col] + ([rating_col] if rating_col else [])
+    accumulator = InteractionAccumulator()
+    start = time.perf_counter()
+    for chunk in iter_event_chunks(events_path, chunksize, columns):
+        if rating_col and min_rating is not None:
+            chunk = chunk[chunk[rating_col] >= min_rating]
+        chunk = chunk.dropna(subset=[user_col, movie_col])
+        accumulator.add(chunk[user_col].values, chunk[movie_col].astype(np.int64).values)
+        print(f"Read {accumulator.events:,} events...")
+
+    matrix, movie_ids = accumulator.matrix()
+    matrix = cap_user_history(matrix, max_items_per_user)
+    print(f"Interaction matrix: {matrix.shape[0]:,} users x {matrix.shape[1]:,} movies, {matrix.nnz:,} pairs")
+
+    index = topk_cooccurrence(matrix, top_k=top_k, min_count=min_count)
+    metadata = {
+        'events': accumulator.events,
+        'users': matrix.shape[0],
+        'movies': matrix.shape[1],
+        'top_k': index.shape[1],
+        'min_count': min_count,
+        'min_rating': min_rating,
+        'max_items_per_user': max_items_per_user,
+        'built_at': time.time(),
+    }
+    print(f"Built co-occurrence neighbors in {time.perf_counter() - start:.1f}s")
+    return CooccurrenceModel(movie_ids, index, metadata)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the co-occurrence engine from an event log")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="Stream a CSV/Parquet event log into a co-occurrence model")
+    build.add_argument('events', help="CSV or .parquet file with one row per watch/rating event")
+    build.add_argument('--catalog', default=artifacts.DEFAULT_CATALOG)
+    build.add_argument('--user-col', default='user_id')
+    build.add_argument('--movie-col', default='movie_id')
+    build.add_argument('--rating-col', default=None)
+    build.add_argument('--min-rating', type=float, default=None, help="Ignore events rated below this")
+    build.add_argument('--top-k', type=int, default=50)
+    build.add_argument('--min-count', type=int, default=2, help="Minimum users in common for a pair")
+    build.add_argument('--max-items-per-user', type=int, default=500)
+    build.add_argument('--chunksize', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    model = build_model(
+        args.events,
+        user_col=args.user_col,
+        movie_col=args.movie_col,
+        rating_col=args.rating_col or ('rating' if args.min_rating is not None else None),
+        min_rating=args.min_rating,
+        chunksize=args.chunksize,
+        top_k=args.top_k,
+        min_count=args.min_count,
+        max_items_per_user=args.max_items_per_user,
+    )
+    path = model_path(args.catalog)
+    model.save(path)
+    print(f"Saved co-occurrence model to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
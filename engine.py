@@ -0,0 +1,329 @@
+"""
+Recommendation Engine for Movie Recommendation App
+Holds the loaded catalog and similarity matrix as an immutable snapshot.
+A background watcher loads newly published artifact versions and swaps
+them in without interrupting requests that are already running.
+"""
+
+import os
+import sys
+import copy
+import threading
+import weakref
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import artifacts
+import cooccurrence
+from neighbors import NeighborIndex
+
+
+# Snapshots by content digest, so catalogs publishing identical builds share one copy
+_shared_snapshots = weakref.WeakValueDictionary()
+_shared_lock = threading.Lock()
+
+# Search terms cached per snapshot, and matches kept per term (ten picker pages)
+SEARCH_CACHE_TERMS = 256
+SEARCH_CACHE_MATCHES = 500
+
+
+class TitleNotFoundError(LookupError):
+    """Raised when a title is not in the snapshot a request runs against"""
+
+
+class Snapshot:
+    """One loaded artifact version; never mutated after construction"""
+
+    def __init__(self, version, movies, similarity):
+        self.version = version
+        self.movies = movies
+        self.similarity = similarity
+        self.title_index = {}
+        for idx, title in enumerate(movies['title'].values):
+            self.title_index.setdefault(title, idx)
+        self._titles = list(movies['title'].values)
+        self._lower_titles = [str(title).lower() for title in self._titles]
+        self._ranked_matches = lru_cache(maxsize=SEARCH_CACHE_TERMS)(
+            lambda term: self._rank_matches(term, SEARCH_CACHE_MATCHES)
+        )
+        self.row_by_movie_id = {}
+        for idx, movie_id in enumerate(movies['movie_id'].values.tolist()):
+            self.row_by_movie_id.setdefault(movie_id, idx)
+        self._nbytes = None
+
+    def _rank_matches(self, term, limit=None):
+        """
+        (indices, total) of titles containing term: exact, then prefix, then
+        word-prefix, then substring. Only the first limit indices are kept.
+        """
+        buckets = ([], [], [], [])
+        for idx, title in enumerate(self._lower_titles):
+            pos = title.find(term)
+            if pos < 0:
+                continue
+            if title == term:
+                buckets[0].append(idx)
+            elif pos == 0:
+                buckets[1].append(idx)
+            elif title[pos - 1] == ' ':
+                buckets[2].append(idx)
+            else:
+                buckets[3].append(idx)
+        total = sum(len(bucket) for bucket in buckets)
+        matches = [idx for bucket in buckets for idx in bucket][:limit]
+        return np.array(matches, dtype=np.int32), total
+
+    def search_titles(self, term, offset=0, limit=50):
+        """
+        Return (titles, total) for one page of titles matching term.
+        An empty term pages through the whole catalog in stored order.
+        """
+        term = (term or '').strip().lower()
+        if not term:
+            return self._titles[offset:offset + limit], len(self._titles)
+        if offset + limit <= SEARCH_CACHE_MATCHES:
+            matches, total = self._ranked_matches(term)
+        else:
+            # Deep pages are rare; rank again rather than caching every match
+            matches, total = self._rank_matches(term)
+        return [self._titles[idx] for idx in matches[offset:offset + limit].tolist()], total
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by this snapshot"""
+        if self._nbytes is None:
+            size = int(self.movies.memory_usage(deep=True).sum())
+            if isinstance(self.similarity, NeighborIndex):
+                size += self.similarity.ids.nbytes + self.similarity.scores.nbytes
+            else:
+                size += getattr(self.similarity, 'nbytes', 0)
+            size += sys.getsizeof(self.title_index) + sys.getsizeof(self._lower_titles)
+            size += sum(sys.getsizeof(title) for title in self._lower_titles)
+            # Room for a full search cache
+            size += SEARCH_CACHE_TERMS * min(SEARCH_CACHE_MATCHES, len(self._titles)) * np.dtype(np.int32).itemsize
+            self._nbytes = size
+        return self._nbytes
+
+    @classmethod
+    def load(cls, version=None, artifacts_dir=artifacts.ARTIFACTS_DIR):
+        if version is None:
+            version = artifacts.current_version(artifacts_dir)
+        digest = artifacts.content_digest(version, artifacts_dir) if version else None
+
+        with _shared_lock:
+            shared = _shared_snapshots.get(digest) if digest else None
+        if shared is not None:
+            # Same data under this catalog's version id; all structures are shared
+            snapshot = copy.copy(shared)
+            snapshot.version = version
+            return snapshot
+
+        if version is None:
+            version, movies_dict, similarity = artifacts.load_current(artifacts_dir)
+        else:
+            movies_dict, similarity = artifacts.load_version(version, artifacts_dir)
+        movies = pd.DataFrame(movies_dict).reset_index(drop=True)
+        # Tags are only needed to build the index; titles repeat across catalogs
+        movies = movies.drop(columns=['tags'], errors='ignore')
+        movies['title'] = [sys.intern(str(title)) for title in movies['title'].values]
+
+        snapshot = cls(version, movies, similarity)
+        if digest:
+            with _shared_lock:
+                _shared_snapshots[digest] = snapshot
+        return snapshot
+
+
+class RecommendationEngine:
+    """Serves recommendations from the current snapshot and hot-swaps new versions"""
+
+    def __init__(self, artifacts_dir=artifacts.ARTIFACTS_DIR, name=artifacts.DEFAULT_CATALOG,
+                 cooccurrence_weight=0.3, on_change=None):
+        self.name = name
+        # Called with the engine after a swap or model reload changed what it holds
+        self.on_change = on_change
+        self.artifacts_dir = artifacts_dir
+        self.cooccurrence_weight = cooccurrence_weight
+        self._lock = threading.Lock()
+        self._snapshot = Snapshot.load(artifacts_dir=artifacts_dir)
+        self._previous = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self.cooccurrence = None
+        self._cooccurrence_mtime = None
+        self._load_cooccurrence()
+        print(f"Engine '{name}' loaded artifact version {self._snapshot.version}")
+
+    def _load_cooccurrence(self):
+        """Load (or reload, if the file changed) this catalog's co-occurrence model"""
+        path = cooccurrence.store_model_path(self.artifacts_dir)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        if mtime == self._cooccurrence_mtime:
+            return False
+        self.cooccurrence = cooccurrence.CooccurrenceModel.load(path)
+        self._cooccurrence_mtime = mtime
+        print(f"Engine '{self.name}' loaded co-occurrence model for {len(self.cooccurrence.movie_ids):,} movies")
+        return True
+
+    @property
+    def snapshot(self):
+        """The snapshot new requests should use; callers keep their own reference"""
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    @property
+    def movies(self):
+        return self._snapshot.movies
+
+    def snapshots(self):
+        """Snapshots currently held in memory (served and rollback)"""
+        return [snap for snap in (self._snapshot, self._previous) if snap is not None]
+
+    def _notify_change(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def search_titles(self, term, offset=0, limit=50):
+        return self._snapshot.search_titles(term, offset, limit)
+
+    def recommend(self, title, k=5, snapshot=None, cooccurrence_weight=None):
+        """
+        Return up to k (title, movie_id) pairs most similar to title.
+        The whole lookup runs against a single snapshot, so a swap in the
+        middle of a request cannot mix rows from two versions. When a
+        co-occurrence model is loaded, content and co-occurrence scores are
+        blended with the given weight (default: the engine's).
+        Raises TitleNotFoundError when the title is not in that snapshot,
+        e.g. because a newly swapped-in version dropped or renamed it.
+        """
+        snap = snapshot or self._snapshot
+        movie_index = snap.title_index.get(title)
+        if movie_index is None:
+            raise TitleNotFoundError(f"'{title}' is not in artifact version {snap.version}")
+        if isinstance(snap.similarity, NeighborIndex):
+            ranked = snap.similarity.neighbors(movie_index)
+        else:
+            # Dense similarity matrix from builds before the sharded neighbor index
+            distances = snap.similarity[movie_index]
+            ranked = sorted(enumerate(distances), reverse=True, key=lambda x: x[1])
+
+        weight = self.cooccurrence_weight if cooccurrence_weight is None else cooccurrence_weight
+        model = self.cooccurrence
+        if model is not None and weight > 0:
+            ranked = self._blend(snap, movie_index, ranked, model, weight, pool=max(4 * k, 20))
+
+        results = []
+        for idx, score in ranked:
+            if idx == movie_index or score == float('-inf'):
+                continue
+            row = snap.movies.iloc[idx]
+            results.append((row.title, row.movie_id))
+            if len(results) == k:
+                break
+        return results
+
+    def cache_key(self, title, k=5, snapshot=None, **filters):
+        """
+        Identity of a recommendation result. It changes whenever the served
+        artifacts or the co-occurrence model change, which invalidates
+        cached results automatically.
+        """
+        snap = snapshot or self._snapshot
+        return (
+            self.name,
+            snap.version,
+            self._cooccurrence_mtime,
+            self.cooccurrence_weight,
+            title,
+            k,
+            tuple(sorted(filters.items())),
+        )
+
+    @staticmethod
+    def _blend(snap, movie_index, content_ranked, model, weight, pool):
+        """Merge content and co-occurrence candidates into one weighted ranking"""
+        related = model.neighbors(snap.movies.iloc[movie_index].movie_id)
+        if not related:
+            return content_ranked
+
+        combined = {}
+        for idx, score in content_ranked:
+            if idx == movie_index or score == float('-inf'):
+                continue
+            combined[idx] = (1 - weight) * float(score)
+            if len(combined) == pool:
+                break
+        for movie_id, score in related:
+            idx = snap.row_by_movie_id.get(movie_id)
+            if idx is None or idx == movie_index:
+                continue
+            combined[idx] = combined.get(idx, 0.0) + weight * score
+        return sorted(combined.items(), key=lambda x: x[1], reverse=True)
+
+    def swap_to(self, version=None):
+        """Load a version (default: the published one) and make it current"""
+        new_snapshot = Snapshot.load(version, self.artifacts_dir)
+        with self._lock:
+            if new_snapshot.version == self._snapshot.version:
+                return False
+            self._previous = self._snapshot
+            self._snapshot = new_snapshot
+        print(f"Engine swapped to artifact version {new_snapshot.version}")
+        self._notify_change()
+        return True
+
+    def refresh(self):
+        """Swap to the published version if it differs from the one being served"""
+        reloaded = self._load_cooccurrence()
+        if reloaded:
+            self._notify_change()
+        published = artifacts.current_version(self.artifacts_dir)
+        if published is None or published == self._snapshot.version:
+            return reloaded
+        return self.swap_to(published)
+
+    def rollback(self):
+        """
+        Instantly return to the previously served snapshot and repoint
+        CURRENT at it, so the watcher does not swap forward again.
+        """
+        with self._lock:
+            if self._previous is None:
+                raise artifacts.ArtifactError("No previous version loaded in memory")
+            self._snapshot, self._previous = self._previous, self._snapshot
+            version = self._snapshot.version
+        if version != 'legacy':
+            artifacts.set_current(version, self.artifacts_dir)
+        print(f"Engine rolled back to artifact version {version}")
+        return version
+
+    def start_watcher(self, interval=30.0):
+        """Poll the CURRENT pointer in a daemon thread and hot-swap on change"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Engine refresh failed, keeping version {self._snapshot.version}: {e}")
+
+        self._watcher = threading.Thread(target=watch, name='artifact-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self, wait=True):
+        self._stop.set()
+        if self._watcher is not None:
+            if wait:
+                self._watcher.join()
+            self._watcher = None
@@ -4,12 +4,12 @@ This script generates the required pickle files for the application.
 Run this script before deploying to generate the similarity matrix and movies dictionary.
 """
 
+import os
+import shutil
 import pandas as pd
 import numpy as np
 import ast
-import pickle
 from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from nltk.stem.porter import PorterStemmer
 import nltk
 
@@ -60,16 +60,49 @@ def download_csv_files():
             print(f"Error downloading {file}: {e}")
             print(f"Created a minimal {file} to allow the app to run with limited functionality.")
 
-def process_movies_data():
-    """Process the movies data and generate similarity matrix"""
-    print("Loading movie data...")
-    
-    # Ensure CSV files exist
-    download_csv_files()
-    
+# Bump a stage's version whenever its code changes so stale cache entries are not reused
+PARSE_VERSION = 1
+STEM_VERSION = 1
+VECTORIZE_VERSION = 1
+NEIGHBORS_VERSION = 2
+
+
+def convert(obj):
+    """Convert a string representation of a list of dicts to a list of names"""
+    L = []
+    for i in ast.literal_eval(obj):
+        L.append(i['name'])
+    return L
+
+
+def convert3(obj):
+    """Get the top 3 cast members"""
+    L = []
+    counter = 0
+    for i in ast.literal_eval(obj):
+        if counter != 3:
+            L.append(i['name'])
+            counter += 1
+        else:
+            break
+    return L
+
+
+def fetch_director(obj):
+    """Get the director from the crew list"""
+    L = []
+    for i in ast.literal_eval(obj):
+        if i['job'] == 'Director':
+            L.append(i['name'])
+            break
+    return L
+
+
+def parse_movies(movies_csv, credits_csv):
+    """Stage 1: load the CSVs and build lowercase tag strings"""
     # Load the data
-    movies = pd.read_csv('tmdb_5000_movies.csv')
-    credits = pd.read_csv('tmdb_5000_credits.csv')
+    movies = pd.read_csv(movies_csv)
+    credits = pd.read_csv(credits_csv)
     
     # Merge the datasets
     movies = movies.merge(credits, on='title')
@@ -79,43 +112,11 @@ def process_movies_data():
     
     # Drop null values
     movies.dropna(inplace=True)
-    
-    print("Processing movie features...")
-    
-    # Function to convert string representations of lists to actual lists
-    def convert(obj):
-        L = []
-        for i in ast.literal_eval(obj):
-            L.append(i['name'])
-        return L
 
     # Apply conversion to genres and keywords
     movies['genres'] = movies['genres'].apply(convert)
     movies['keywords'] = movies['keywords'].apply(convert)
-
-    # Function to get top 3 cast members
-    def convert3(obj):
-        L = []
-        counter = 0
-        for i in ast.literal_eval(obj):
-            if counter != 3:
-                L.append(i['name'])
-                counter += 1
-            else:
-                break
-        return L
-
     movies['cast'] = movies['cast'].apply(convert3)
-
-    # Function to get director
-    def fetch_director(obj):
-        L = []
-        for i in ast.literal_eval(obj):
-            if i['job'] == 'Director':
-                L.append(i['name'])
-                break
-        return L
-
     movies['crew'] = movies['crew'].apply(fetch_director)
 
     # Convert overview to list of words
@@ -139,83 +140,141 @@ def process_movies_data():
     # Convert to lowercase
     new_df['tags'] = new_df['tags'].apply(lambda x: x.lower())
 
-    print("Applying text processing...")
-    
-    # Initialize Porter Stemmer
+    return new_df
+
+
+def stem_tags(new_df):
+    """Stage 2: Porter-stem every tag token"""
     ps = PorterStemmer()
+    stems = {}
 
     def stem(text):
         y = []
         for i in text.split():
-            y.append(ps.stem(i))
+            # Each distinct token is stemmed once
+            if i not in stems:
+                stems[i] = ps.stem(i)
+            y.append(stems[i])
         return " ".join(y)
 
-    # Apply stemming
+    new_df = new_df.copy()
     new_df['tags'] = new_df['tags'].apply(stem)
+    return new_df
 
-    print("Creating similarity matrix...")
-    
-    # Create CountVectorizer
-    cv = CountVectorizer(max_features=5000, stop_words='english')
 
-    # Transform tags to vectors
-    vectors = cv.fit_transform(new_df['tags']).toarray()
+def vectorize_tags(tags, max_features, stop_words):
+    """Stage 3: bag-of-words vectors (kept sparse)"""
+    cv = CountVectorizer(max_features=max_features, stop_words=stop_words)
+    return cv.fit_transform(tags)
+
 
-    # Calculate cosine similarity
-    similarity = cosine_similarity(vectors)
+def compute_neighbors(vectors, work_dir, top_k, block_size, processes):
+    """Stage 4: top-K cosine neighbors per movie, computed in resumable shards"""
+    from neighbors import build_neighbors
+    return build_neighbors(vectors, work_dir, top_k=top_k, block_size=block_size, processes=processes)
 
-    print("Saving files...")
+
+def process_movies_data(max_features=5000, stop_words='english', use_cache=True,
+                        top_k=50, block_size=512, processes=1, catalog='default',
+                        movies_csv='tmdb_5000_movies.csv', credits_csv='tmdb_5000_credits.csv'):
+    """Process the movies data and generate similarity matrix"""
+    from build_cache import StageCache, file_digest
     
-    # Save the files with absolute paths
-    import os
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    movies_dict_path = os.path.join(base_dir, 'movies_dict.pkl')
-    similarity_path = os.path.join(base_dir, 'similarity.pkl')
+    print("Loading movie data...")
+    
+    # Ensure CSV files exist
+    download_csv_files()
+    
+    cache = StageCache(enabled=use_cache)
     
-    print(f"Saving movies_dict.pkl to: {movies_dict_path}")
-    print(f"Saving similarity.pkl to: {similarity_path}")
+    print("Processing movie features...")
+    parse_key, parsed = cache.run(
+        'parse', PARSE_VERSION, {},
+        [file_digest(movies_csv), file_digest(credits_csv)],
+        lambda: parse_movies(movies_csv, credits_csv)
+    )
+
+    print("Applying text processing...")
+    stem_key, new_df = cache.run(
+        'stem', STEM_VERSION, {'stemmer': 'porter'}, [parse_key],
+        lambda: stem_tags(parsed)
+    )
+
+    print("Creating neighbor index...")
+    vectorize_key, vectors = cache.run(
+        'vectorize', VECTORIZE_VERSION,
+        {'max_features': max_features, 'stop_words': stop_words}, [stem_key],
+        lambda: vectorize_tags(new_df['tags'], max_features, stop_words)
+    )
+
+    # Shard results live next to the cache so a killed build resumes per shard
+    shard_dir = os.path.join(cache.cache_dir, 'shards', f"{vectorize_key[:16]}-k{top_k}-b{block_size}")
+    neighbors_key, similarity = cache.run(
+        'neighbors', NEIGHBORS_VERSION,
+        {'metric': 'cosine', 'top_k': top_k, 'block_size': block_size}, [vectorize_key],
+        lambda: compute_neighbors(vectors, shard_dir, top_k, block_size, processes)
+    )
+    shutil.rmtree(shard_dir, ignore_errors=True)
+
+    print("Publishing files...")
     
-    pickle.dump(new_df.to_dict(), open(movies_dict_path, 'wb'))
-    pickle.dump(similarity, open(similarity_path, 'wb'))
+    # Write a new versioned build and atomically switch the CURRENT pointer
+    import artifacts
+    catalog_dir = artifacts.catalog_dir(catalog)
+    version = artifacts.publish_version(
+        new_df.to_dict(),
+        similarity,
+        artifacts_dir=catalog_dir,
+        metadata={
+            'catalog': catalog,
+            'movies': len(new_df),
+            'neighbors_shape': list(similarity.shape),
+            'max_features': max_features,
+            'stop_words': stop_words,
+            'stage_keys': {
+                'parse': parse_key,
+                'stem': stem_key,
+                'vectorize': vectorize_key,
+                'neighbors': neighbors_key,
+            },
+        }
+    )
 
     print(f"Files generated successfully!")
+    print(f"Version: {version}")
     print(f"Movies: {len(new_df)}")
-    print(f"Similarity matrix shape: {similarity.shape}")
-    
-    # Verify files were created
-    if os.path.exists(movies_dict_path) and os.path.exists(similarity_path):
-        print(f"Verified: Both pickle files were created successfully.")
-    else:
-        missing = []
-        if not os.path.exists(movies_dict_path):
-            missing.append("movies_dict.pkl")
-        if not os.path.exists(similarity_path):
-            missing.append("similarity.pkl")
-        print(f"Warning: The following files were not created: {', '.join(missing)}")
+    print(f"Neighbor index shape: {similarity.shape}")
+    print(f"Published to: {artifacts.version_path(version, catalog_dir)}")
+    print(f"Stages reused from cache: {', '.join(cache.hits) or 'none'}")
 
 
-def generate_data_files():
+def generate_data_files(**build_options):
     """Main function to generate data files, can be called from other modules"""
     print("Movie Recommendation Data Generator")
     print("=" * 40)
     
     try:
         download_nltk_data()
-        process_movies_data()
+        process_movies_data(**build_options)
         print("\nData generation completed successfully!")
         return True
     except Exception as e:
         print(f"Error during data generation: {e}")
+        import artifacts
+        catalog = build_options.get('catalog', artifacts.DEFAULT_CATALOG)
+        try:
+            store = artifacts.catalog_dir(catalog)
+        except artifacts.ArtifactError:
+            return False
+        if artifacts.has_published_data(store):
+            # Never replace a good published build; running engines would swap it in
+            print(f"Keeping the published version of catalog '{catalog}'; nothing was published.")
+            return False
         print("Attempting to create minimal data files for basic functionality...")
         try:
-            # Create minimal pickle files if full generation fails
-            import os
+            # Publish a minimal build if full generation fails and nothing is published yet
             import numpy as np
             
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            movies_dict_path = os.path.join(base_dir, 'movies_dict.pkl')
-            similarity_path = os.path.join(base_dir, 'similarity.pkl')
-            
             # Create a minimal movies dictionary
             minimal_df = pd.DataFrame({
                 'movie_id': [19995],
@@ -226,12 +285,13 @@ def generate_data_files():
             # Create a minimal similarity matrix
             minimal_similarity = np.array([[1.0]])
             
-            # Save the minimal files
-            print(f"Saving minimal movies_dict.pkl to: {movies_dict_path}")
-            pickle.dump(minimal_df.to_dict(), open(movies_dict_path, 'wb'))
-            
-            print(f"Saving minimal similarity.pkl to: {similarity_path}")
-            pickle.dump(minimal_similarity, open(similarity_path, 'wb'))
+            # Publish the minimal files into the catalog that was being built
+            artifacts.publish_version(
+                minimal_df.to_dict(),
+                minimal_similarity,
+                artifacts_dir=store,
+                metadata={'catalog': catalog, 'minimal': True}
+            )
             
             print("Created minimal data files for basic functionality.")
             return True
@@ -240,7 +300,38 @@ def generate_data_files():
             return False
 
 if __name__ == "__main__":
-    success = generate_data_files()
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate the recommendation data files")
+    parser.add_argument('--max-features', type=int, default=5000, help="CountVectorizer vocabulary size")
+    parser.add_argument('--stop-words', default='english', help="Stop-word list passed to CountVectorizer ('none' to disable)")
+    parser.add_argument('--no-cache', action='store_true', help="Recompute every build stage")
+    parser.add_argument('--top-k', type=int, default=50, help="Neighbors kept per movie")
+    parser.add_argument('--block-size', type=int, default=512, help="Rows per neighbor shard")
+    parser.add_argument('--processes', type=int, default=1, help="Local worker processes for the neighbor shards")
+    parser.add_argument('--catalog', default='default', help="Name of the catalog to publish")
+    parser.add_argument('--movies-csv', default='tmdb_5000_movies.csv', help="Movies CSV for this catalog")
+    parser.add_argument('--credits-csv', default='tmdb_5000_credits.csv', help="Credits CSV for this catalog")
+    parser.add_argument('--bundle', nargs='?', const='', default=None,
+                        help="Also export a compressed release bundle (default path: bundles/<catalog>.m2wb)")
+    args = parser.parse_args()
+    
+    success = generate_data_files(
+        max_features=args.max_features,
+        stop_words=None if args.stop_words == 'none' else args.stop_words,
+        use_cache=not args.no_cache,
+        top_k=args.top_k,
+        block_size=args.block_size,
+        processes=args.processes,
+        catalog=args.catalog,
+        movies_csv=args.movies_csv,
+        credits_csv=args.credits_csv
+    )
+    if success and args.bundle is not None:
+        import bundles
+        bundles.export_bundle(
+            args.bundle or os.path.join(bundles.BUNDLES_DIR, f"{args.catalog}{bundles.BUNDLE_EXTENSION}"),
+            catalog=args.catalog
+        )
     if success:
         print("You can now run the Streamlit app with: streamlit run app.py")
     else:
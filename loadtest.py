@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Load Test Harness for Movie Recommender Pro
+Simulates concurrent user sessions doing search -> select -> recommend
+against the recommendation engine, with TMDB replaced by a local stub
+server whose latency and failure rate are configurable. Reports throughput
+and p50/p95/p99 latency per step for each stage of a ramp profile, plus
+the number of poster lookups that failed. Selecting a title is only a list
+lookup when the engine is called directly, so it is not timed.
+
+Example:
+    python loadtest.py --ramp 1:20,5:20,10:20,25:30 --tmdb-latency-ms 80 --tmdb-failure-rate 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import string
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STEPS = ('search', 'recommend')
+
+
+class TMDBStubHandler(BaseHTTPRequestHandler):
+    """Answers /movie/<id> like TMDB, after an artificial delay"""
+
+    latency = 0.0
+    jitter = 0.0
+    failure_rate = 0.0
+
+    def do_GET(self):
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if random.random() < self.failure_rate:
+            self.send_response(503)
+            self.end_headers()
+            return
+        movie_id = self.path.split('?')[0].rstrip('/').split('/')[-1]
+        body = json.dumps({'id': movie_id, 'poster_path': f'/stub_{movie_id}.jpg'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_tmdb_stub(latency_ms, jitter_ms, failure_rate):
+    """Start the TMDB stub on a free local port; returns (server, base_url)"""
+    handler = type('ConfiguredTMDBStub', (TMDBStubHandler,), {
+        'latency': latency_ms / 1000.0,
+        'jitter': jitter_ms / 1000.0,
+        'failure_rate': failure_rate,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='tmdb-stub', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/3"
+
+
+def parse_ramp(spec):
+    """Parse 'users:seconds,users:seconds,...' into a list of (users, seconds)"""
+    stages = []
+    for part in spec.split(','):
+        users, seconds = part.split(':')
+        stages.append((int(users), float(seconds)))
+    return stages
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+class StepStats:
+    """Thread-safe latency and error collection for one stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self.poster_lookups = 0
+        self.poster_failures = 0
+        self.sessions = 0
+
+    def record(self, step, seconds):
+        with self._lock:
+            self.latencies[step].append(seconds)
+
+    def record_error(self, step):
+        with self._lock:
+            self.errors[step] += 1
+
+    def record_posters(self, lookups, failures):
+        with self._lock:
+            self.poster_lookups += lookups
+            self.poster_failures += failures
+
+    def record_session(self):
+        with self._lock:
+            self.sessions += 1
+
+
+class Session:
+    """One simulated user: search for a title, select a match, get recommendations"""
+
+    page_size = 50
+
+    def __init__(self, engine, recommend, think_time, rng):
+        self.engine = engine
+        self.recommend = recommend
+        self.think_time = think_time
+        self.rng = rng
+        self.titles = engine.movies['title'].values
+
+    def _search_term(self):
+        title = self.rng.choice(self.titles)
+        words = [w for w in title.split() if len(w) >= 3] or [title]
+        term = self.rng.choice(words)
+        if self.rng.random() < 0.1:
+            term = ''.join(self.rng.choice(string.ascii_lowercase) for _ in range(6))
+        return term
+
+    def _timed(self, stats, step, fn):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            stats.record_error(step)
+            raise
+        stats.record(step, time.perf_counter() - start)
+        return result
+
+    def _pause(self):
+        if self.think_time > 0:
+            time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+    def run_once(self, stats):
+        term = self._search_term()
+
+        def search():
+            # Mirrors the picker in app.py: one page of server-side matches per rerun
+            options, total = self.engine.search_titles(term, offset=0, limit=self.page_size)
+            if total == 0:
+                options, _ = self.engine.search_titles('', offset=0, limit=10)
+            return options
+
+        options = self._timed(stats, 'search', search)
+        self._pause()
+        selected = options[self.rng.randrange(len(options))]
+        self._pause()
+        self._timed(stats, 'recommend', lambda: self.recommend(selected, stats))
+        stats.record_session()
+
+
+def run_stage(engine, recommend, users, seconds, think_time, seed):
+    """Run `users` concurrent sessions for `seconds`; returns (stats, elapsed)"""
+    stats = StepStats()
+    deadline = time.perf_counter() + seconds
+
+    def worker(worker_id):
+        session = Session(engine, recommend, think_time, random.Random(seed + worker_id))
+        while time.perf_counter() < deadline:
+            try:
+                session.run_once(stats)
+            except Exception:
+                pass
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return stats, time.perf_counter() - start
+
+
+def summarize(users, stats, elapsed):
+    row = {'users': users, 'elapsed_s': round(elapsed, 2), 'sessions': stats.sessions,
+           'sessions_per_s': round(stats.sessions / elapsed, 2) if elapsed else 0.0,
+           'poster_lookups': stats.poster_lookups, 'poster_failures': stats.poster_failures, 'steps': {}}
+    for step in STEPS:
+        values = stats.latencies[step]
+        row['steps'][step] = {
+            'count': len(values),
+            'errors': stats.errors[step],
+            'throughput_per_s': round(len(values) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+        }
+    return row
+
+
+def print_report(rows):
+    print("\n" + "=" * 88)
+    print(f"{'users':>6} {'step':<10} {'count':>7} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 88)
+    for row in rows:
+        for step in STEPS:
+            s = row['steps'][step]
+            print(f"{row['users']:>6} {step:<10} {s['count']:>7} {s['errors']:>7} {s['throughput_per_s']:>9} "
+                  f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}")
+        print(f"{'':>6} {'tmdb':<10} {row['poster_lookups']:>7} {row['poster_failures']:>7}")
+        print(f"{'':>6} {'sessions':<10} {row['sessions']:>7} {'':>7} {row['sessions_per_s']:>9}")
+        print("-" * 88)
+
+    # Saturation: first stage where adding users stops adding throughput
+    for prev, row in zip(rows, rows[1:]):
+        if row['sessions_per_s'] < prev['sessions_per_s'] * 1.05:
+            print(f"Throughput saturates at ~{prev['users']} concurrent users "
+                  f"({prev['sessions_per_s']} sessions/s)")
+            break
+    else:
+        print("No saturation point reached; extend the ramp profile")
+
+
+def build_recommend(engine, with_posters, k, result_cache=None):
+    """
+    The recommend step as app.py performs it: neighbour lookup plus k poster
+    fetches. Poster lookups are recorded in stats only when they are made,
+    not for cached or coalesced results; like the app, results with failed
+    lookups are not stored in the result cache.
+    """
+    from tmdb import fetch_poster_url, TMDBError, PLACEHOLDER_POSTER
+
+    def poster(movie_id):
+        try:
+            return fetch_poster_url(movie_id), 0
+        except TMDBError:
+            return PLACEHOLDER_POSTER, 1
+
+    def compute(title, snapshot, stats):
+        results = engine.recommend(title, k=k, snapshot=snapshot)
+        if not with_posters:
+            return results, 0
+        fetched = [(name, poster(movie_id)) for name, movie_id in results]
+        failures = sum(failed for _, (_, failed) in fetched)
+        stats.record_posters(len(fetched), failures)
+        return [(name, url) for name, (url, _) in fetched], failures
+
+    def recommend(title, stats):
+        snapshot = engine.snapshot
+        if result_cache is None:
+            return compute(title, snapshot, stats)
+        return result_cache.get_or_compute(
+            engine.cache_key(title, k=k, snapshot=snapshot),
+            lambda: compute(title, snapshot, stats),
+            cacheable=lambda result: not result[1]
+        )
+
+    return recommend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for the recommendation flow")
+    parser.add_argument('--ramp', default='1:15,5:15,10:15,25:15,50:15',
+                        help="Ramp profile as users:seconds pairs, e.g. 1:30,10:30,50:60")
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help="Mean pause between steps in seconds (uniform 0..2x)")
+    parser.add_argument('--tmdb-latency-ms', type=float, default=50.0, help="Stub TMDB response latency")
+    parser.add_argument('--tmdb-jitter-ms', type=float, default=10.0, help="Stub TMDB latency jitter (+/-)")
+    parser.add_argument('--tmdb-failure-rate', type=float, default=0.0, help="Fraction of stub TMDB calls that fail")
+    parser.add_argument('--no-posters', action='store_true', help="Skip poster fetches in the recommend step")
+    parser.add_argument('--k', type=int, default=5, help="Recommendations per request")
+    parser.add_argument('--result-cache', type=int, default=0,
+                        help="Put a result cache of this many entries in front of recommend (0: off)")
+    parser.add_argument('--artifacts-dir', default=None, help="Artifact store to load (default: the app's)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', dest='json_path', default=None, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    import artifacts
+    from engine import RecommendationEngine
+
+    server, base_url = start_tmdb_stub(args.tmdb_latency_ms, args.tmdb_jitter_ms, args.tmdb_failure_rate)
+    os.environ['TMDB_API_BASE'] = base_url
+    print(f"TMDB stub listening at {base_url} "
+          f"(latency {args.tmdb_latency_ms}ms, failure rate {args.tmdb_failure_rate:.0%})")
+
+    engine = RecommendationEngine(args.artifacts_dir or artifacts.ARTIFACTS_DIR)
+    result_cache = None
+    if args.result_cache:
+        from result_cache import ResultCache
+        result_cache = ResultCache(maxsize=args.result_cache)
+    recommend = build_recommend(engine, not args.no_posters, args.k, result_cache)
+    print(f"Loaded {len(engine.movies):,} movies (version {engine.version})")
+
+    rows = []
+    for users, seconds in parse_ramp(args.ramp):
+        print(f"Running {users} concurrent sessions for {seconds:.0f}s...")
+        stats, elapsed = run_stage(engine, recommend, users, seconds, args.think_time, args.seed)
+        rows.append(summarize(users, stats, elapsed))
+
+    server.shutdown()
+    print_report(rows)
+    if result_cache is not None:
+        print(f"Result cache: {result_cache.stats()}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"Results written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
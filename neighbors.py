@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Sharded Neighbor Build for Movie Recommendation App
+Instead of one dense cosine_similarity call, the rows are split into
+blocks (shards). Each shard computes the similarities of its rows against
+the whole catalog and keeps only the top-K neighbors per row. Shards are
+claimed through lock files in a shared work directory, so they can be
+processed by several local processes or by workers on other machines that
+share the filesystem. Finished shards are kept on disk, so a killed build
+resumes where it stopped. A final merge produces the NeighborIndex.
+
+Join a running build from another machine with:
+    python neighbors.py worker <work_dir>
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+VECTORS_FILE = 'vectors.npz'
+PLAN_FILE = 'plan.json'
+SHARD_PREFIX = 'shard-'
+
+
+class NeighborIndex:
+    """Top-K neighbors per movie: ids[i] and scores[i] sorted by descending score"""
+
+    def __init__(self, ids, scores):
+        self.ids = ids
+        self.scores = scores
+
+    @property
+    def shape(self):
+        return self.ids.shape
+
+    def __len__(self):
+        return len(self.ids)
+
+    def neighbors(self, row):
+        """(index, score) pairs for a row, best first"""
+        return zip(self.ids[row].tolist(), self.scores[row].tolist())
+
+
+def normalize_rows(vectors):
+    """L2-normalize the rows of a sparse matrix so dot products are cosines"""
+    vectors = sp.csr_matrix(vectors, dtype=np.float32)
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.csr_matrix(sp.diags(1.0 / norms) @ vectors, dtype=np.float32)
+
+
+def _shard_path(work_dir, shard_id):
+    return os.path.join(work_dir, f"{SHARD_PREFIX}{shard_id:05d}.npz")
+
+
+def _lock_path(work_dir, shard_id):
+    return os.path.join(work_dir, f"{SHARD_PREFIX}{shard_id:05d}.lock")
+
+
+def prepare(vectors, work_dir, top_k, block_size):
+    """
+    Write the normalized vectors and the shard plan to the work directory.
+    A directory that already holds the same plan is reused as-is, which is
+    what makes an interrupted build resumable.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    plan_path = os.path.join(work_dir, PLAN_FILE)
+    n_rows = vectors.shape[0]
+    plan = {
+        'rows': n_rows,
+        'top_k': min(top_k, max(n_rows - 1, 1)),
+        'block_size': block_size,
+        'shards': -(-n_rows // block_size),
+    }
+
+    if os.path.exists(plan_path):
+        with open(plan_path) as f:
+            if json.load(f) == plan:
+                return plan
+
+    normalized = normalize_rows(vectors)
+    tmp_path = os.path.join(work_dir, f".{VECTORS_FILE}.{os.getpid()}.npz")
+    sp.save_npz(tmp_path, normalized)
+    os.replace(tmp_path, os.path.join(work_dir, VECTORS_FILE))
+
+    tmp_path = f"{plan_path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(plan, f)
+    os.replace(tmp_path, plan_path)
+    return plan
+
+
+def load_plan(work_dir):
+    with open(os.path.join(work_dir, PLAN_FILE)) as f:
+        return json.load(f)
+
+
+def compute_shard(normalized, shard_id, top_k, block_size):
+    """Top-K (ids, scores) for the rows of one shard, excluding each row itself"""
+    start = shard_id * block_size
+    stop = min(start + block_size, normalized.shape[0])
+    scores = (normalized[start:stop] @ normalized.T).toarray()
+    rows = np.arange(stop - start)
+    scores[rows, rows + start] = -np.inf
+
+    top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    ids = np.take_along_axis(top, order, axis=1).astype(np.int32)
+    return ids, np.take_along_axis(top_scores, order, axis=1).astype(np.float32)
+
+
+def _try_claim(work_dir, shard_id, stale_after):
+    """Create the shard's lock file; steal it if its owner stopped heartbeating"""
+    lock_path = _lock_path(work_dir, shard_id)
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(lock_path) < stale_after:
+                return False
+            os.remove(lock_path)
+            print(f"Reclaiming stale shard {shard_id}")
+        except FileNotFoundError:
+            pass
+        return _try_claim(work_dir, shard_id, float('inf'))
+    with os.fdopen(fd, 'w') as f:
+        f.write(_owner())
+    return True
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _release(lock_path):
+    """Remove a lock file unless another worker has since reclaimed it"""
+    try:
+        with open(lock_path) as f:
+            if f.read() != _owner():
+                return
+        os.remove(lock_path)
+    except FileNotFoundError:
+        pass
+
+
+class _Heartbeat:
+    """Touches a lock file periodically so other workers know its shard is alive"""
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(work_dir, stale_after=300.0, heartbeat=30.0):
+    """Claim and compute shards until none are left unclaimed; returns shards computed"""
+    plan = load_plan(work_dir)
+    normalized = sp.load_npz(os.path.join(work_dir, VECTORS_FILE)).tocsr()
+    computed = 0
+
+    for shard_id in range(plan['shards']):
+        if os.path.exists(_shard_path(work_dir, shard_id)):
+            continue
+        if not _try_claim(work_dir, shard_id, stale_after):
+            continue
+        lock_path = _lock_path(work_dir, shard_id)
+        try:
+            if os.path.exists(_shard_path(work_dir, shard_id)):
+                # Finished by another worker between the check and the claim
+                continue
+            with _Heartbeat(lock_path, heartbeat):
+                ids, scores = compute_shard(normalized, shard_id, plan['top_k'], plan['block_size'])
+            tmp_path = os.path.join(work_dir, f".{SHARD_PREFIX}{shard_id:05d}.{os.getpid()}.npz")
+            np.savez(tmp_path, ids=ids, scores=scores)
+            os.replace(tmp_path, _shard_path(work_dir, shard_id))
+            computed += 1
+        finally:
+            _release(lock_path)
+    return computed
+
+
+def pending_shards(work_dir):
+    plan = load_plan(work_dir)
+    return [s for s in range(plan['shards']) if not os.path.exists(_shard_path(work_dir, s))]
+
+
+def merge(work_dir):
+    """Concatenate all shard results into a NeighborIndex"""
+    plan = load_plan(work_dir)
+    ids, scores = [], []
+    for shard_id in range(plan['shards']):
+        with np.load(_shard_path(work_dir, shard_id)) as shard:
+            ids.append(shard['ids'])
+            scores.append(shard['scores'])
+    return NeighborIndex(np.vstack(ids), np.vstack(scores))
+
+
+def _worker_process(args):
+    work_dir, stale_after = args
+    return run_worker(work_dir, stale_after=stale_after)
+
+
+def build_neighbors(vectors, work_dir, top_k=50, block_size=512, processes=1,
+                    stale_after=300.0, poll_interval=5.0):
+    """
+    Compute the NeighborIndex for vectors using sharded workers.
+    Runs `processes` local workers (in this process when 1) next to any
+    remote workers pointed at work_dir, then waits for shards claimed by
+    others before merging.
+    """
+    plan = prepare(vectors, work_dir, top_k, block_size)
+    remaining = len(pending_shards(work_dir))
+    print(f"Neighbor build: {plan['shards']} shards of {block_size} rows, "
+          f"{plan['shards'] - remaining} already done, top_k={plan['top_k']}")
+
+    if processes > 1 and remaining > 1:
+        from multiprocessing import Pool
+        with Pool(processes) as pool:
+            pool.map(_worker_process, [(work_dir, stale_after)] * processes)
+    else:
+        run_worker(work_dir, stale_after=stale_after)
+
+    while True:
+        pending = pending_shards(work_dir)
+        if not pending:
+            break
+        print(f"Waiting for {len(pending)} shard(s) held by other workers...")
+        time.sleep(poll_interval)
+        run_worker(work_dir, stale_after=stale_after)
+
+    return merge(work_dir)
+
+
+def main(argv):
+    if len(argv) < 3 or argv[1] != 'worker':
+        print("Usage: python neighbors.py worker <work_dir> [stale_after_seconds]")
+        return 1
+    work_dir = argv[2]
+    stale_after = float(argv[3]) if len(argv) > 3 else 300.0
+    computed = run_worker(work_dir, stale_after=stale_after)
+    print(f"Computed {computed} shard(s); {len(pending_shards(work_dir))} still pending")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
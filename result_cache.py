@@ -0,0 +1,109 @@
+"""
+Recommendation Result Cache for Movie Recommendation App
+A bounded LRU cache of finished recommendation results (titles plus
+poster URLs). Concurrent requests for the same key are coalesced: the
+first caller computes, the others wait for its result instead of repeating
+the lookup and the TMDB calls. Keys include the catalog and artifact
+version, so a newly published build never serves old results.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class _InFlight:
+    """A computation other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache with in-flight request coalescing"""
+
+    def __init__(self, maxsize=1024, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.uncached = 0
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """
+        Return the cached result for key, computing it at most once at a time.
+        Results for which cacheable(result) is false are handed to the callers
+        waiting on this computation but not stored.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                waiting = self._inflight[key] = _InFlight()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+
+        if not owner:
+            waiting.done.wait()
+            if waiting.error is not None:
+                raise waiting.error
+            return waiting.result
+
+        try:
+            result = compute()
+        except BaseException as e:
+            # Failures are not cached; waiters see the same error
+            waiting.error = e
+            raise
+        else:
+            waiting.result = result
+            if cacheable is not None and not cacheable(result):
+                with self._lock:
+                    self.uncached += 1
+                return result
+            with self._lock:
+                self._entries[key] = (time.monotonic(), result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiting.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'uncached': self.uncached,
+                'hit_rate': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            }
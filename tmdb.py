@@ -0,0 +1,46 @@
+"""
+TMDB Client for Movie Recommendation App
+Fetches poster URLs from the TMDB API. The API base URL and key can be
+overridden with TMDB_API_BASE / TMDB_API_KEY, e.g. to point at a local stub.
+"""
+
+import os
+import requests
+
+DEFAULT_API_KEY = 'cf6b9abd89d5c0bff0a66c4b2a50feea'
+PLACEHOLDER_POSTER = "https://via.placeholder.com/500x750?text=No+Image"
+POSTER_BASE_URL = "https://image.tmdb.org/t/p/w500/"
+
+
+def api_base():
+    return os.environ.get('TMDB_API_BASE', 'https://api.themoviedb.org/3').rstrip('/')
+
+
+def api_key():
+    return os.environ.get('TMDB_API_KEY', DEFAULT_API_KEY)
+
+
+class TMDBError(Exception):
+    """Raised when TMDB could not be reached or answered with an error"""
+
+
+def fetch_poster_url(movie_id, timeout=10):
+    """
+    Return the poster URL for a movie, or the placeholder if it has none.
+    Raises TMDBError when the request itself fails.
+    """
+    try:
+        response = requests.get(
+            f'{api_base()}/movie/{movie_id}?api_key={api_key()}&language=en-US',
+            timeout=timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+    except Exception as e:
+        raise TMDBError(f"Poster lookup for movie {movie_id} failed: {e}") from e
+    poster_path = data.get('poster_path')
+    if poster_path:
+        return POSTER_BASE_URL + poster_path
+    else:
+        return PLACEHOLDER_POSTER
+
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+UI Timing for Movie Recommender Pro
+Measures the server-side wall time of AppTest.run() for each Home page
+interaction (search keystroke, next page, Surprise Me, recommend), with
+TMDB replaced by the load test's stub server. Every interaction is timed
+the same way, so runs against two versions of app.py are comparable:
+
+    python ui_timing.py                            # this tree's app.py
+    python ui_timing.py --app ../old/app.py        # another checkout
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from loadtest import start_tmdb_stub
+
+INTERACTIONS = ('search', 'page', 'surprise', 'recommend')
+
+
+def _button(at, text):
+    return next(b for b in at.button if text in b.label)
+
+
+def _movie_selectbox(at):
+    return next(s for s in at.selectbox if s.label == 'Choose your movie:')
+
+
+def _timed_run(at, timeout):
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+def measure(app_path, repeats, timeout=60):
+    """Median wall time in ms of AppTest.run() per interaction"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    at.run()
+    timings = {name: [] for name in INTERACTIONS}
+    for i in range(repeats):
+        at.text_input(key='movie_search').input('')
+        _timed_run(at, timeout)
+        # A fresh term each time so search caches don't hide the work
+        at.text_input(key='movie_search').input('abcdefghijklmnopqrstuvwxyz'[i % 26])
+        timings['search'].append(_timed_run(at, timeout))
+
+        at.text_input(key='movie_search').input('')
+        _timed_run(at, timeout)
+        _button(at, 'Next').click()
+        timings['page'].append(_timed_run(at, timeout))
+
+        _button(at, 'Surprise Me').click()
+        timings['surprise'].append(_timed_run(at, timeout))
+
+        # A different title each time so a result cache can't answer
+        picker = _movie_selectbox(at)
+        picker.select(picker.options[i % len(picker.options)])
+        _timed_run(at, timeout)
+        _button(at, 'Get Recommendations').click()
+        timings['recommend'].append(_timed_run(at, timeout))
+
+    return {name: round(statistics.median(values) * 1000, 1) for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Home page interactions with streamlit AppTest")
+    parser.add_argument('--app', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'),
+                        help="app.py to measure (default: this tree's)")
+    parser.add_argument('--repeats', type=int, default=5, help="Runs per interaction; the median is reported")
+    parser.add_argument('--tmdb-latency-ms', type=float, default=50.0, help="Stub TMDB response latency")
+    parser.add_argument('--json', dest='json_path', default=None, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    app_path = os.path.abspath(args.app)
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    # The app imports its modules from its own directory
+    sys.path.insert(0, os.path.dirname(app_path))
+    os.chdir(os.path.dirname(app_path))
+
+    server, base_url = start_tmdb_stub(args.tmdb_latency_ms, 0.0, 0.0)
+    os.environ['TMDB_API_BASE'] = base_url
+    try:
+        results = measure(app_path, args.repeats)
+    finally:
+        server.shutdown()
+
+    print(f"\nAppTest.run() wall time, median of {args.repeats} ({app_path}):")
+    for name in INTERACTIONS:
+        print(f"  {name:<10} {results[name]:>8.1f} ms")
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())